@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: process_bulk_notifications, per-item vs. bulk database path
+
+Seeds a throwaway database with users, then pushes one large batch (50k
+items by default) through:
+
+  1. the old per-item loop - query(User).get() and db.add() per item
+  2. the current task - one IN query, one multi-row INSERT per sub-chunk
+
+Email delivery is replaced with a no-op sender in both runs so the numbers
+isolate the database and bookkeeping cost; see mailer_benchmark.py for SMTP.
+
+Run from the backend directory:
+
+    python -m benchmarks.bulk_notifications_benchmark --items 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="bulk-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.sqlite3")
+os.environ.setdefault("BROKER_URL", "memory://")
+
+from utils.db import Base, SessionLocal, engine
+from services.user_service.models import User
+from services.task_service.models import Task
+from services.notification_service.models import Notification
+from services.notification_service import tasks as notification_tasks
+
+
+def null_deliver(messages):
+    return [None] * len(messages)
+
+
+def seed_users(count):
+    db = SessionLocal()
+    try:
+        db.execute(User.__table__.insert(), [
+            {"username": f"bench{i}", "email": f"bench{i}@example.com",
+             "password_hash": "x", "created_at": datetime.utcnow()}
+            for i in range(count)
+        ])
+        db.commit()
+        return [user_id for (user_id,) in db.query(User.id)]
+    finally:
+        db.close()
+
+
+def make_batch(user_ids, size):
+    return [
+        {"user_id": user_ids[i % len(user_ids)], "title": f"Bulk {i}", "message": "Benchmark body"}
+        for i in range(size)
+    ]
+
+
+def legacy_process(batch):
+    """The pre-bulk implementation, minus the email call"""
+    db = SessionLocal()
+    try:
+        for data in batch:
+            user = db.query(User).get(data["user_id"])
+            if not user:
+                continue
+            db.add(Notification(
+                user_id=data["user_id"], task_id=data.get("task_id"),
+                notify_type=data.get("type", "bulk"), title=data["title"],
+                message=data["message"], sent_at=datetime.utcnow()
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def timed(label, fn, batch):
+    start = time.perf_counter()
+    fn(batch)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22}: {elapsed:8.2f}s  {len(batch) / elapsed:10.1f} items/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--skip-legacy", action="store_true", help="skip the per-item run")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    notification_tasks.deliver = null_deliver
+
+    user_ids = seed_users(args.users)
+    batch = make_batch(user_ids, args.items)
+    print(f"📬 {args.items} notifications for {args.users} users on {engine.url}")
+    print("=" * 60)
+
+    if not args.skip_legacy:
+        timed("per-item (legacy)", legacy_process, batch)
+    timed("bulk (current)", notification_tasks.process_bulk_notifications, batch)
+
+
+if __name__ == "__main__":
+    main()
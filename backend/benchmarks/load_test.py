@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Load test: scripted HTTP scenarios against the three services
+
+Virtual users (asyncio tasks, one keep-alive connection per service each)
+run these scenarios, one after another:
+
+  signup_storm        every user registers, logs in and loads /users/me, --iterations times
+  dashboard_polling   signed-in users poll tasks, notifications and profile for --duration
+  bulk_task_creation  every user creates --tasks-per-user tasks
+  mass_completion     every user completes --tasks-per-user tasks created beforehand
+
+Sign-ins and tasks a scenario needs beforehand are set up unmeasured. The
+workload is drawn from --seed, so two runs send the same requests. Only
+the run id in usernames differs, which lets runs share a database.
+
+Targets:
+
+  in-process  the three Flask apps on threaded local servers in a child
+              process, with a throw-away SQLite database, the in-memory
+              Celery transport (--celery queue: tasks wait in the broker,
+              eager: they run inside the request) and HTTP rate limits off
+  --base-url  a running stack, e.g. docker-compose behind nginx; start it
+              with RATE_LIMIT_ENABLED=false or the sign-ups get 429s
+
+The report gives throughput, p50/p95/p99 latency and error rate per
+endpoint, as a table and optionally as JSON (--output). --compare takes an
+earlier JSON report and exits 1 if a p95 grew by more than --tolerance or
+an error rate rose.
+
+Run from the backend directory:
+
+    python -m benchmarks.load_test --users 20 --output load.json
+    python -m benchmarks.load_test --scenarios dashboard_polling --duration 30 --compare load.json
+    python -m benchmarks.load_test --base-url http://localhost:8080 --users 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# Path prefix -> service, for in-process targets (nginx does this for the stack)
+SERVICE_PREFIXES = [
+    ("/auth", "user"), ("/users", "user"),
+    ("/tasks", "task"), ("/jobs", "task"),
+    ("/notifications", "notification"),
+]
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; reopened when the server closes it"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=b"", headers=()):
+        head = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        head += [f"{name}: {value}" for name, value in headers]
+        data = ("\r\n".join(head) + "\r\n\r\n").encode() + body
+        for attempt in range(2):
+            fresh = self.writer is None
+            if fresh:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self.writer.write(data)
+                await self.writer.drain()
+                return await self._response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if fresh or attempt:
+                    raise  # Only a reused connection may have gone stale; retry that once
+
+    async def _response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed before the response")
+        version, status = status_line.decode().split(" ", 2)[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                chunks.append(await self.reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            body = b"".join(chunk[:-2] for chunk in chunks)
+        else:
+            body = await self.reader.read()
+            headers["connection"] = "close"
+
+        if version == "HTTP/1.0" or headers.get("connection", "").lower() == "close":
+            self.close()
+        return int(status), body
+
+
+class Recorder:
+    """Latencies and statuses per endpoint for one scenario"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+
+    def add(self, endpoint, status, seconds):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        self.statuses.setdefault(endpoint, Counter())[str(status)] += 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            statuses = self.statuses[endpoint]
+            errors = sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 400)
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+                "error_rate": round(errors / len(samples), 4),
+                "statuses": dict(statuses),
+            }
+        requests = sum(e["requests"] for e in endpoints.values())
+        errors = sum(e["error_rate"] * e["requests"] for e in endpoints.values())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": requests,
+            "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(errors / requests, 4) if requests else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+class VirtualUser:
+    """A client with its own connections, credentials and random stream"""
+
+    def __init__(self, services, recorder, rng, name):
+        self.services = services
+        self.recorder = recorder
+        self.rng = rng
+        self.name = name
+        self.token = None
+        self.task_ids = []
+        self._connections = {}
+
+    def _connection(self, path):
+        base = self.services.get("*")
+        if base is None:
+            base = next(self.services[service] for prefix, service in SERVICE_PREFIXES if path.startswith(prefix))
+        if base not in self._connections:
+            url = urlsplit(base)
+            self._connections[base] = Connection(url.hostname, url.port or 80)
+        return self._connections[base]
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+
+    async def call(self, method, path, payload=None):
+        """Send one request and record it under its route; returns (status, decoded body)"""
+        endpoint = f"{method} {re.sub(r'/[0-9]+', '/{id}', path.split('?')[0])}"
+        headers = [("Accept", "application/json")]
+        body = b""
+        if payload is not None:
+            body = json.dumps(payload).encode()
+            headers.append(("Content-Type", "application/json"))
+        if self.token:
+            headers.append(("Authorization", f"Bearer {self.token}"))
+
+        start = time.perf_counter()
+        try:
+            status, raw = await self._connection(path).request(method, path, body, headers)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            self.recorder.add(endpoint, type(e).__name__, time.perf_counter() - start)
+            return None, None
+        self.recorder.add(endpoint, status, time.perf_counter() - start)
+        try:
+            return status, json.loads(raw) if raw else None
+        except ValueError:
+            return status, None
+
+    async def sign_in(self):
+        await self.call("POST", "/auth/register", {
+            "username": self.name, "email": f"{self.name}@loadtest.example", "password": "load-test-pw"
+        })
+        status, body = await self.call("POST", "/auth/login", {"username": self.name, "password": "load-test-pw"})
+        self.token = body["access_token"] if status == 200 else None
+        return self.token is not None
+
+    async def create_task(self):
+        due = datetime(2030, 1, 1) + timedelta(days=self.rng.randint(-3, 30), minutes=self.rng.randint(0, 1439))
+        status, body = await self.call("POST", "/tasks", {
+            "title": f"Load test task {self.rng.randint(1, 10**6)}",
+            "description": "Created by benchmarks/load_test.py",
+            "due_date": due.isoformat(),
+            "priority": "high" if self.rng.random() < 0.1 else "normal",
+        })
+        if status == 201:
+            self.task_ids.append(body["id"])
+
+
+# Each scenario: (setup, measured run); both get the virtual user and the parsed options
+async def _no_setup(user, args):
+    pass
+
+
+async def _signed_in(user, args):
+    await user.sign_in()
+
+
+async def _signed_in_with_tasks(user, args):
+    if await user.sign_in():
+        for _ in range(args.tasks_per_user):
+            await user.create_task()
+
+
+async def signup_storm(user, args):
+    base = user.name
+    for i in range(args.iterations):
+        user.name, user.token = f"{base}-{i}", None
+        if await user.sign_in():
+            await user.call("GET", "/users/me")
+
+
+async def dashboard_polling(user, args):
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        await user.call("GET", "/tasks")
+        await user.call("GET", "/notifications/unread-count")
+        await user.call("GET", "/notifications?limit=20")
+        await user.call("GET", "/users/me")
+        await asyncio.sleep(user.rng.uniform(0, 2 * args.think_time))
+
+
+async def bulk_task_creation(user, args):
+    for _ in range(args.tasks_per_user):
+        await user.create_task()
+
+
+async def mass_completion(user, args):
+    for task_id in user.task_ids:
+        await user.call("PUT", f"/tasks/{task_id}", {"completed": True})
+
+
+SCENARIOS = {
+    "signup_storm": (_no_setup, signup_storm),
+    "dashboard_polling": (_signed_in, dashboard_polling),
+    "bulk_task_creation": (_signed_in, bulk_task_creation),
+    "mass_completion": (_signed_in_with_tasks, mass_completion),
+}
+
+
+async def run_scenario(name, services, args, run_id):
+    setup, scenario = SCENARIOS[name]
+    rng = random.Random(f"{args.seed}:{name}")
+    users = [
+        VirtualUser(services, Recorder(), random.Random(rng.random()), f"lt-{run_id}-{name[:6]}-{i}")
+        for i in range(args.users)
+    ]
+    await asyncio.gather(*(setup(user, args) for user in users))
+
+    recorder = Recorder()
+    for user in users:
+        user.recorder = recorder  # Setup traffic is not measured
+    started = time.perf_counter()
+    await asyncio.gather(*(scenario(user, args) for user in users))
+    elapsed = time.perf_counter() - started
+    for user in users:
+        user.close()
+    return recorder.report(elapsed)
+
+
+def serve(ready_file, celery_mode):
+    """Child process: serve the three apps on free local ports until terminated"""
+    import threading
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from utils.broker import app as celery_app
+    from services.user_service.api import app as user_app
+    from services.task_service.api import app as task_app
+    from services.notification_service.api import app as notification_app
+
+    celery_app.conf.task_always_eager = celery_mode == "eager"
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    services = {}
+    for name, app in (("user", user_app), ("task", task_app), ("notification", notification_app)):
+        server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        services[name] = f"http://127.0.0.1:{server.server_port}"
+
+    with open(ready_file + ".tmp", "w") as f:
+        json.dump(services, f)
+    os.replace(ready_file + ".tmp", ready_file)
+    # Not a blocking read of stdin: the password pool forks, and its workers close stdin
+    threading.Event().wait()
+
+
+def start_in_process(tmp, args):
+    """Migrate a fresh SQLite database and start the serving child; returns (process, services)"""
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'load.sqlite3')}",
+        BROKER_URL="memory://",
+        REDIS_URL="memory://",
+        RATE_LIMIT_ENABLED="false",  # One client address; the limits would measure themselves
+    )
+    if args.password_hash_method:
+        env["PASSWORD_HASH_METHOD"] = args.password_hash_method
+    subprocess.run([sys.executable, "manage.py", "migrate"], env=env, cwd=BACKEND, check=True, capture_output=True)
+
+    ready_file = os.path.join(tmp, "services.json")
+    log_file = os.path.join(tmp, "server.log")
+    with open(log_file, "w") as log:
+        child = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.load_test", "--serve", ready_file, "--celery", args.celery],
+            env=env, cwd=BACKEND, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT
+        )
+    deadline = time.monotonic() + 60
+    while not os.path.exists(ready_file):
+        if child.poll() is not None or time.monotonic() > deadline:
+            child.kill()
+            with open(log_file) as f:
+                raise RuntimeError(f"Services did not start:\n{f.read()[-2000:]}")
+        time.sleep(0.1)
+    with open(ready_file) as f:
+        return child, json.load(f)
+
+
+def compare(report, baseline, tolerance):
+    """Print changes against ``baseline``; returns the regressions found"""
+    regressions = []
+    print(f"\n📈 Compared with the baseline (p95 tolerance {tolerance:.0%})")
+    for scenario, result in report["scenarios"].items():
+        for endpoint, now in result["endpoints"].items():
+            before = baseline.get("scenarios", {}).get(scenario, {}).get("endpoints", {}).get(endpoint)
+            if before is None:
+                continue
+            p95_change = now["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+            rps_change = now["throughput_rps"] / before["throughput_rps"] - 1 if before["throughput_rps"] else 0.0
+            flag = ""
+            if p95_change > tolerance or now["error_rate"] > before["error_rate"]:
+                flag = "  ❌"
+                regressions.append(f"{scenario} {endpoint}")
+            print(f"  {scenario:<20}{endpoint:<34}p95 {p95_change:>+7.1%}  rps {rps_change:>+7.1%}  "
+                  f"errors {before['error_rate']:.2%} -> {now['error_rate']:.2%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenario names")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users per scenario")
+    parser.add_argument("--iterations", type=int, default=3, help="sign-ups per user in signup_storm")
+    parser.add_argument("--tasks-per-user", type=int, default=10, help="tasks per user to create or complete")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of dashboard_polling")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean pause between polls, seconds")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the generated workload")
+    parser.add_argument("--base-url", help="test a running stack (e.g. http://localhost:8080) instead")
+    parser.add_argument("--celery", choices=("queue", "eager"), default="queue",
+                        help="in-process: leave tasks in the memory broker, or run them in the request")
+    parser.add_argument("--password-hash-method", help="in-process PASSWORD_HASH_METHOD override")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth with --compare")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.celery)
+        return
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    run_id = uuid.uuid4().hex[:8]
+    report = {
+        "meta": {
+            "target": args.base_url or f"in-process (sqlite, celery {args.celery})",
+            "users": args.users,
+            "iterations": args.iterations,
+            "tasks_per_user": args.tasks_per_user,
+            "duration_s": args.duration,
+            "seed": args.seed,
+            "started_at": datetime.utcnow().isoformat(),
+        },
+        "scenarios": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        child = None
+        if args.base_url:
+            services = {"*": args.base_url}
+        else:
+            child, services = start_in_process(tmp, args)
+        try:
+            print(f"🚦 {report['meta']['target']}, {args.users} virtual users")
+            print("=" * 104)
+            print(f"{'scenario':<20}{'endpoint':<34}{'requests':>9}{'req/s':>9}"
+                  f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+            for name in names:
+                result = asyncio.run(run_scenario(name, services, args, run_id))
+                report["scenarios"][name] = result
+                for endpoint, row in result["endpoints"].items():
+                    print(f"{name:<20}{endpoint:<34}{row['requests']:>9}{row['throughput_rps']:>9.1f}"
+                          f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['error_rate']:>9.1%}")
+        finally:
+            if child is not None:
+                child.terminate()
+                child.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} endpoint(s) regressed")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: login throughput and latency at increasing concurrency
+
+Each concurrency level runs N request threads that log in repeatedly
+for --seconds. Meanwhile one more thread polls GET /health, which shows
+how much the password work slows every other request on the replica.
+This is done twice:
+
+  inline  PASSWORD_HASH_WORKERS=0, hashing on the request thread (the old behaviour)
+  pool    hashing in the bounded process pool (PASSWORD_HASH_WORKERS / _QUEUE)
+
+Each mode runs in a fresh subprocess against a throw-away SQLite database.
+Rejected logins (503 when the pool is saturated) are counted separately.
+
+Run from the backend directory:
+
+    python -m benchmarks.login_benchmark --concurrency 1,4,16,64 --seconds 5
+    python -m benchmarks.login_benchmark --method pbkdf2:sha256:600000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def run_child(levels, seconds):
+    """Log in at each concurrency level; returns one result dict per level"""
+    from services.user_service.api import app
+
+    client = app.test_client()
+    client.post("/auth/register", json={"username": "bench", "email": "bench@example.com", "password": "pw-bench"})
+    results = []
+    for concurrency in levels:
+        latencies, rejected, health = [], [0], []
+        started = time.perf_counter()
+        stop = started + seconds
+        lock = threading.Lock()
+
+        def login():
+            own = app.test_client()
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                status = own.post("/auth/login", json={"username": "bench", "password": "pw-bench"}).status_code
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if status == 200:
+                        latencies.append(elapsed)
+                    else:
+                        rejected[0] += 1
+
+        def probe():
+            own = app.test_client()
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                own.get("/health")
+                health.append(time.perf_counter() - start)
+                time.sleep(0.01)
+
+        threads = [threading.Thread(target=login) for _ in range(concurrency)] + [threading.Thread(target=probe)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started  # Includes logins still in flight at the deadline
+
+        results.append({
+            "concurrency": concurrency,
+            "logins_per_s": len(latencies) / elapsed,
+            "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "rejected": rejected[0],
+            "health_p95_ms": percentile(health, 0.95) * 1000,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16,64", help="comma-separated thread counts")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each level")
+    parser.add_argument("--method", default=None, help="PASSWORD_HASH_METHOD to benchmark")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    if args.child:
+        print(json.dumps(run_child(levels, args.seconds)))
+        return
+
+    from utils.config import PASSWORD_HASH_METHOD, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE
+    method = args.method or PASSWORD_HASH_METHOD
+    print(f"🔐 {method}, pool of {PASSWORD_HASH_WORKERS} workers + {PASSWORD_HASH_QUEUE} queued, "
+          f"{args.seconds:.0f}s per level")
+    print("=" * 84)
+    print(f"{'mode':<8}{'threads':>8}{'logins/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'503s':>8}{'health p95 ms':>16}")
+
+    for mode in ("inline", "pool"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'login.sqlite3')}",
+                BROKER_URL="memory://",
+                REDIS_URL="memory://",
+                PASSWORD_HASH_METHOD=method,
+                RATE_LIMIT_ENABLED="false",  # Measure hashing, not the login rate limit
+            )
+            if mode == "inline":
+                env["PASSWORD_HASH_WORKERS"] = "0"
+            subprocess.run([sys.executable, "manage.py", "migrate"], env=env, cwd=BACKEND,
+                           check=True, capture_output=True)
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.login_benchmark", "--child",
+                 "--concurrency", args.concurrency, "--seconds", str(args.seconds)],
+                env=env, cwd=BACKEND, capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+
+        for row in json.loads(output):
+            print(f"{mode:<8}{row['concurrency']:>8}{row['logins_per_s']:>11.1f}{row['p50_ms']:>10.1f}"
+                  f"{row['p95_ms']:>10.1f}{row['rejected']:>8}{row['health_p95_ms']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
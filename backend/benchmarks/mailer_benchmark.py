@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: connection-per-email vs. pooled SMTP sessions
+
+Starts a local aiosmtpd server that accepts and discards mail, then sends the
+same batch of emails through each delivery path:
+
+  1. the old way - a fresh SMTP connection for every message
+  2. through the mailer's connection pool with send_many()
+  3. through the asyncio delivery engine (needs aiosmtplib)
+
+Run from the backend directory (requires `pip install aiosmtpd`):
+
+    python -m benchmarks.mailer_benchmark --emails 10000
+"""
+import argparse
+import os
+import smtplib
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HOST = "127.0.0.1"
+PORT = 8025
+
+# The mailer reads its settings at import time, so point it at the stand-in first
+os.environ.setdefault("SMTP_SERVER", HOST)
+os.environ.setdefault("SMTP_PORT", str(PORT))
+os.environ.setdefault("SMTP_USE_TLS", "false")
+# Measure raw delivery, not the outbound rate limits
+os.environ.setdefault("SMTP_RATE_GLOBAL", "0")
+os.environ.setdefault("SMTP_RATE_PER_DOMAIN", "0")
+
+from services.notification_service.mailer import SMTPConnectionPool, build_message
+from services.notification_service import async_mailer
+
+
+class _DiscardHandler:
+    async def handle_DATA(self, server, session, envelope):
+        return "250 OK"
+
+
+def start_stand_in():
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        print("❌ aiosmtpd is not installed: pip install aiosmtpd")
+        sys.exit(1)
+    controller = Controller(_DiscardHandler(), hostname=HOST, port=PORT)
+    controller.start()
+    return controller
+
+
+def make_messages(count):
+    return [
+        (f"user{i}@example.com", f"Benchmark message {i}", "Benchmark body")
+        for i in range(count)
+    ]
+
+
+def bench_connection_per_email(messages):
+    start = time.perf_counter()
+    for to_addr, subject, body in messages:
+        with smtplib.SMTP(HOST, PORT) as smtp:
+            smtp.send_message(build_message(to_addr, subject, body))
+    return time.perf_counter() - start
+
+
+def bench_pooled(messages, batch_size):
+    pool = SMTPConnectionPool(HOST, PORT)
+    start = time.perf_counter()
+    failed = 0
+    for i in range(0, len(messages), batch_size):
+        failed += sum(1 for error in pool.send_many(messages[i:i + batch_size]) if error)
+    elapsed = time.perf_counter() - start
+    pool.close()
+    if failed:
+        print(f"⚠️  {failed} messages failed in pooled run")
+    return elapsed
+
+
+def bench_async(messages, concurrency):
+    start = time.perf_counter()
+    results = async_mailer.deliver(messages, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for error in results if error)
+    if failed:
+        print(f"⚠️  {failed} messages failed in async run")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="messages per send_many() call in the pooled run")
+    parser.add_argument("--concurrency", type=int, default=20,
+                        help="concurrent SMTP sessions in the async run")
+    parser.add_argument("--skip-baseline", action="store_true",
+                        help="skip the connection-per-email run")
+    args = parser.parse_args()
+
+    controller = start_stand_in()
+    messages = make_messages(args.emails)
+    print(f"📬 Sending {args.emails} emails to aiosmtpd on {HOST}:{PORT}")
+    print("=" * 60)
+
+    try:
+        if not args.skip_baseline:
+            elapsed = bench_connection_per_email(messages)
+            print(f"connection per email : {elapsed:8.2f}s  {args.emails / elapsed:10.1f} msg/s")
+
+        elapsed = bench_pooled(messages, args.batch_size)
+        print(f"pooled send_many     : {elapsed:8.2f}s  {args.emails / elapsed:10.1f} msg/s")
+
+        if async_mailer.aiosmtplib is None:
+            print("asyncio engine       : skipped (pip install aiosmtplib)")
+        else:
+            elapsed = bench_async(messages, args.concurrency)
+            print(f"asyncio engine       : {elapsed:8.2f}s  {args.emails / elapsed:10.1f} msg/s")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
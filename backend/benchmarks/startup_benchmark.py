@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start cost of each service and the worker
+
+For every target, a fresh interpreter is started --repeats times and
+measures:
+
+  import   seconds to import the service's module (the app, or worker.py's
+           Celery app with its task modules)
+  first    seconds from interpreter start to the first answered request
+           (GET /health through the Flask test client), or to the worker
+           having every task registered
+
+Medians are printed per target. Use --json to store the numbers and
+compare them across releases. Each run uses a throw-away SQLite database
+that `manage.py migrate` has already set up, and an in-memory broker, so
+nothing external is contacted.
+
+Run from the backend directory:
+
+    python -m benchmarks.startup_benchmark --repeats 7
+    python -m benchmarks.startup_benchmark --json > startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+TARGETS = {
+    "user": "services.user_service.api",
+    "task": "services.task_service.api",
+    "notification": "services.notification_service.api",
+    "worker": "worker",
+}
+
+
+def run_child(target, started):
+    """Import ``target`` and serve its first request; returns (import s, first s)"""
+    import importlib
+
+    before = time.perf_counter()
+    module = importlib.import_module(TARGETS[target])
+    imported = time.perf_counter() - before
+
+    if target == "worker":
+        module.app.loader.import_default_modules()
+        assert any(name.startswith("tasks.") for name in module.app.tasks)
+    else:
+        response = module.app.test_client().get("/health")
+        assert response.status_code == 200, response.status_code
+    return imported, time.time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--targets", default=",".join(TARGETS), help="comma-separated subset of " + ", ".join(TARGETS))
+    parser.add_argument("--json", action="store_true", help="print a JSON report instead of a table")
+    parser.add_argument("--child", metavar="TARGET", help=argparse.SUPPRESS)
+    parser.add_argument("--started", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.argv = [sys.argv[0]]  # worker.py reads its own arguments
+        imported, first = run_child(args.child, args.started)
+        print(json.dumps({"import": imported, "first": first}))
+        return
+
+    targets = [name.strip() for name in args.targets.split(",") if name.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.sqlite3')}",
+            BROKER_URL="memory://",
+            REDIS_URL="memory://",
+        )
+        subprocess.run([sys.executable, "manage.py", "migrate"], env=env, cwd=BACKEND,
+                       check=True, capture_output=True)
+
+        report = {"python": sys.version.split()[0], "repeats": args.repeats, "targets": {}}
+        for target in targets:
+            samples = []
+            for _ in range(args.repeats):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.startup_benchmark",
+                     "--child", target, "--started", repr(time.time())],
+                    env=env, cwd=BACKEND, capture_output=True, text=True, check=True
+                ).stdout.strip().splitlines()[-1]
+                samples.append(json.loads(output))
+            report["targets"][target] = {
+                "import_ms": round(statistics.median(s["import"] for s in samples) * 1000, 1),
+                "first_request_ms": round(statistics.median(s["first"] for s in samples) * 1000, 1),
+            }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"⏱️  Cold start, median of {args.repeats} fresh interpreters")
+    print("=" * 48)
+    print(f"{'target':<14}{'import ms':>14}{'first request ms':>20}")
+    for target, result in report["targets"].items():
+        print(f"{target:<14}{result['import_ms']:>14.1f}{result['first_request_ms']:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for the backend
+
+    python manage.py migrate     # apply pending schema migrations
+    python manage.py explain     # check the hot queries use their indexes
+
+The services and workers no longer touch the schema when they import, so
+run this once per deploy, before they start.
+"""
+import time
+import click
+
+@click.group()
+def cli():
+    """Backend maintenance commands"""
+    pass
+
+def wait_for_database(engine, timeout):
+    """Retry connecting for up to ``timeout`` seconds; the database may still be starting"""
+    from sqlalchemy.exc import OperationalError
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with engine.connect():
+                return
+        except OperationalError as e:
+            if time.monotonic() >= deadline:
+                raise click.ClickException(f"Database not reachable after {timeout}s: {e.orig}")
+            click.echo("⏳ Waiting for the database...")
+            time.sleep(1)
+
+@cli.command("migrate")
+@click.option("--list", "list_only", is_flag=True, help="Show pending migrations without applying them")
+@click.option("--wait", default=0, type=int, help="Seconds to keep retrying while the database is unreachable")
+def migrate(list_only, wait):
+    """Apply pending schema migrations (see utils/migrations.py)."""
+    from utils.db import engine
+    from utils.migrations import migrate as run_migrations, pending_migrations
+
+    wait_for_database(engine, wait)
+    if list_only:
+        for version, description, _ in pending_migrations(engine):
+            click.echo(f"{version:04d}  {description}")
+        return
+    applied = run_migrations(engine)
+    click.secho(f"✅ Schema up to date ({len(applied)} migrations applied)", fg="green")
+
+@cli.command("explain")
+@click.option("--verbose", is_flag=True, help="Print each query plan")
+def explain(verbose):
+    """Check that every hot-path query is served by its index."""
+    from utils.db import engine
+    from utils.query_plans import check_query_plans
+
+    failures = 0
+    for label, index, ok, plan in check_query_plans(engine):
+        click.secho(f"{'✅' if ok else '❌'} {label}: {index}", fg="green" if ok else "red")
+        if verbose or not ok:
+            click.echo("    " + plan.replace("\n", "\n    "))
+        failures += not ok
+    if failures:
+        raise click.ClickException(f"{failures} hot queries are not using their index")
+
+if __name__ == "__main__":
+    cli()
@@ -1,24 +1,26 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
-from utils.db import engine, Base, SessionLocal
-from utils.config import JWT_SECRET
+from utils.db import SessionLocal
+from utils.config import JWT_SECRET, NOTIFICATION_PAGE_SIZE, NOTIFICATION_PAGE_SIZE_MAX
 import services.notification_service.models  # register table
 from .models import Notification
+from .logic import mark_read, mark_all_read, get_unread_count, notifications_page, decode_cursor
+from .stream import serialize, event_stream
+from utils.jobs import Job, job_status
+from utils.revocation import register_revocation_check
+from utils.http_ratelimit import install_rate_limiting
 from flask_cors import CORS
 
-# Import async tasks
-from .tasks import (
-    send_instant_notification, send_daily_digest, 
-    process_bulk_notifications, scheduled_due_soon_check, scheduled_overdue_check
-)
+# Tasks are queued by name, so the API never imports their implementations
 
 app = Flask(__name__)
 app.config["JWT_SECRET_KEY"] = JWT_SECRET
+app.config["JWT_TOKEN_LOCATION"] = ["headers"]
 jwt = JWTManager(app)
-CORS(app, origins=["http://localhost:5173"], supports_credentials=True)
-
-# ensure our table exists
-Base.metadata.create_all(bind=engine)
+register_revocation_check(jwt)
+CORS(app, origins=["http://localhost:5173"], supports_credentials=True,
+     expose_headers=["X-Next-Cursor", "X-Prev-Cursor"])
+install_rate_limiting(app, "notification_service")
 
 @app.route("/health")
 def health():
@@ -28,29 +30,61 @@ def health():
 @app.route("/notifications", methods=["GET"])
 @jwt_required()
 def get_notifications():
-    """Get user's notifications - this is what the frontend expects"""
+    """Get user's notifications - this is what the frontend expects
+
+    Newest first, one page at a time. Optional query parameters:
+    ``limit``, ``before`` / ``after`` (cursors from a previous page),
+    ``type`` and ``task_id``. The body stays a plain list. The cursor for
+    the next older page comes back in X-Next-Cursor (absent on the last
+    page) and the one for newer notifications in X-Prev-Cursor.
+    """
     user_id = get_jwt_identity()
+    try:
+        limit = min(max(int(request.args.get("limit", NOTIFICATION_PAGE_SIZE)), 1), NOTIFICATION_PAGE_SIZE_MAX)
+        task_id = request.args.get("task_id", type=int)
+        before = decode_cursor(request.args["before"]) if "before" in request.args else None
+        after = decode_cursor(request.args["after"]) if "after" in request.args else None
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    if before is not None and after is not None:
+        return jsonify({"msg": "Use either before or after, not both"}), 400
+    
     db = SessionLocal()
     try:
-        notifications = db.query(Notification).filter_by(user_id=user_id).order_by(
-            Notification.sent_at.desc()
-        ).limit(50).all()
+        notifications, older, newer = notifications_page(
+            db, user_id, limit, before=before, after=after,
+            notify_type=request.args.get("type"), task_id=task_id
+        )
         
-        return jsonify([
-            {
-                "id": n.id,
-                "title": n.title or f"Notification ({n.notify_type})",
-                "message": n.message or "No message",
-                "type": n.notify_type,
-                "task_id": n.task_id,
-                "sent_at": n.sent_at.isoformat(),
-                "read": False  # You could add a read field to the model
-            }
-            for n in notifications
-        ]), 200
+        response = jsonify([serialize(n) for n in notifications])
+        if older:
+            response.headers["X-Next-Cursor"] = older
+        if newer:
+            response.headers["X-Prev-Cursor"] = newer
+        return response, 200
     finally:
         db.close()
 
+@app.route("/notifications/stream", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def notification_stream():
+    """Server-sent events: push new notifications as workers store them.
+
+    Browsers reconnect with a Last-Event-ID header and receive what they
+    missed. EventSource cannot set headers, so this view (and only this
+    one) also accepts the token as ?jwt=<token>.
+    """
+    user_id = int(get_jwt_identity())
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    if last_event_id is not None and not last_event_id.isdigit():
+        return jsonify({"msg": "Invalid Last-Event-ID"}), 400
+    
+    return Response(
+        event_stream(user_id, last_event_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route("/notifications/<int:notification_id>/read", methods=["PUT"])
 @jwt_required()
 def mark_notification_read(notification_id):
@@ -58,31 +92,52 @@ def mark_notification_read(notification_id):
     user_id = get_jwt_identity()
     db = SessionLocal()
     try:
-        notification = db.query(Notification).filter_by(
-            id=notification_id, user_id=user_id
-        ).first()
-        
-        if not notification:
+        if not mark_read(db, user_id, notification_id):
             return jsonify({"msg": "Notification not found"}), 404
         
-        # In a real app, you'd have a 'read' field to update
-        # For now, just return success
+        db.commit()
         return jsonify({"msg": "Notification marked as read"}), 200
     finally:
         db.close()
 
+@app.route("/notifications/read-all", methods=["POST"])
+@jwt_required()
+def mark_all_notifications_read():
+    """Mark all of the user's notifications as read in one update"""
+    user_id = get_jwt_identity()
+    db = SessionLocal()
+    try:
+        updated = mark_all_read(db, user_id)
+        db.commit()
+        return jsonify({"msg": "All notifications marked as read", "updated": updated}), 200
+    finally:
+        db.close()
+
+@app.route("/notifications/unread-count", methods=["GET"])
+@jwt_required()
+def unread_count():
+    """Unread badge count, served from the per-user counter row"""
+    user_id = get_jwt_identity()
+    db = SessionLocal()
+    try:
+        return jsonify({"unread": get_unread_count(db, user_id)}), 200
+    finally:
+        db.close()
+
 # Admin/testing endpoints for triggering async tasks
 @app.route("/admin/trigger/due-soon-check", methods=["POST"])
 def admin_trigger_due_soon():
     """Admin endpoint to manually trigger due soon check"""
-    scheduled_due_soon_check.delay()
-    return jsonify({"msg": "Due soon check queued via broker"}), 202
+    job = Job("due_soon_check")
+    job.dispatch("tasks.notification.scheduled_due_soon_check")
+    return jsonify({"msg": "Due soon check queued via broker", "job_id": job.save()}), 202
 
 @app.route("/admin/trigger/overdue-check", methods=["POST"])
 def admin_trigger_overdue():
     """Admin endpoint to manually trigger overdue check"""
-    scheduled_overdue_check.delay()
-    return jsonify({"msg": "Overdue check queued via broker"}), 202
+    job = Job("overdue_check")
+    job.dispatch("tasks.notification.scheduled_overdue_check")
+    return jsonify({"msg": "Overdue check queued via broker", "job_id": job.save()}), 202
 
 @app.route("/admin/send-test-notification", methods=["POST"])
 def admin_send_test_notification():
@@ -90,13 +145,23 @@ def admin_send_test_notification():
     data = request.get_json() or {}
     user_id = data.get("user_id", 1)
     
-    send_instant_notification.delay(
+    job = Job("test_notification", user_id)
+    job.dispatch(
+        "tasks.notification.send_instant_notification",
         user_id,
         "Test Notification 🧪",
         "This is a test notification sent via the message broker!"
     )
     
-    return jsonify({"msg": "Test notification queued via broker"}), 202
+    return jsonify({"msg": "Test notification queued via broker", "job_id": job.save()}), 202
+
+@app.route("/admin/jobs/<job_id>", methods=["GET"])
+def admin_job_status(job_id):
+    """Status of a job started by one of the admin triggers above"""
+    status = job_status(job_id)
+    if status is None or status["user_id"] is not None:
+        return jsonify({"msg": "Job not found"}), 404
+    return jsonify(status), 200
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5003, debug=True)
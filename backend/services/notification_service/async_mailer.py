@@ -0,0 +1,105 @@
+"""
+Asyncio bulk delivery engine for notification batches.
+
+A handful of concurrent SMTP sessions drain one shared list of messages, so
+network latency overlaps instead of adding up message by message. Every
+message gets its own timeout and its own result; callers write the results
+back to the database in one go.
+
+Under a gevent worker pool the pooled synchronous mailer is used instead.
+Its sockets are monkey-patched, so greenlets already overlap the waits, and
+asyncio.run() cannot work there: every greenlet shares one OS thread, so a
+second concurrent call would find the first one's loop running.
+"""
+import asyncio
+from utils.config import (
+    SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_USE_TLS,
+    SMTP_ASYNC_CONCURRENCY, SMTP_SEND_TIMEOUT, SMTP_RATE_MAX_WAIT
+)
+from .mailer import build_message, send_many
+from .throttle import reserve, Deferred
+
+try:
+    import aiosmtplib
+except ImportError:  # pragma: no cover - deliver() falls back to the pooled mailer
+    aiosmtplib = None
+
+async def _connect(timeout):
+    smtp = aiosmtplib.SMTP(
+        hostname=SMTP_SERVER, port=SMTP_PORT, start_tls=SMTP_USE_TLS, timeout=timeout
+    )
+    await smtp.connect()
+    if SMTP_USERNAME:
+        await smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+    return smtp
+
+async def _close(smtp):
+    try:
+        await smtp.quit()
+    except Exception:
+        smtp.close()
+
+async def _sender(pending, messages, results, timeout, max_wait):
+    """One SMTP session sending messages until the shared iterator runs dry"""
+    smtp = None
+    try:
+        for index in pending:
+            to_addr, subject, body = messages[index]
+            # reserve() is a blocking Redis round trip; keep it off the event loop
+            wait = await asyncio.get_running_loop().run_in_executor(None, reserve, to_addr, max_wait)
+            if isinstance(wait, Deferred):
+                results[index] = wait
+                continue
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                if smtp is None:
+                    smtp = await asyncio.wait_for(_connect(timeout), timeout)
+                await asyncio.wait_for(
+                    smtp.send_message(build_message(to_addr, subject, body)), timeout
+                )
+            except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPSenderRefused,
+                    aiosmtplib.SMTPDataError) as e:
+                # The server refused this message; the session is still fine
+                results[index] = str(e)
+            except Exception as e:
+                results[index] = str(e) or type(e).__name__
+                if smtp is not None:
+                    smtp.close()
+                    smtp = None
+    finally:
+        if smtp is not None:
+            await _close(smtp)
+
+async def deliver_async(messages, concurrency=None, timeout=None, max_wait=None):
+    concurrency = concurrency or SMTP_ASYNC_CONCURRENCY
+    timeout = timeout or SMTP_SEND_TIMEOUT
+    results = [None] * len(messages)
+    pending = iter(range(len(messages)))
+    await asyncio.gather(*(
+        _sender(pending, messages, results, timeout, max_wait)
+        for _ in range(min(concurrency, len(messages)))
+    ))
+    return results
+
+def _under_gevent():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+def deliver(messages, concurrency=None, timeout=None, max_wait=SMTP_RATE_MAX_WAIT):
+    """Send ``(to_addr, subject, body)`` tuples concurrently.
+
+    Returns one entry per message, None when accepted or the error text,
+    exactly like ``mailer.send_many``. Messages held back by the outbound
+    rate limit for more than ``max_wait`` seconds come back as
+    ``throttle.Deferred``; callers re-enqueue those. Without aiosmtplib
+    installed, or in a gevent worker, the pooled synchronous mailer is used.
+    """
+    if not messages:
+        return []
+    if aiosmtplib is None or _under_gevent():
+        return send_many(messages, max_wait)
+    return asyncio.run(deliver_async(messages, concurrency, timeout, max_wait))
@@ -0,0 +1,33 @@
+# services/notification_service/cli.py
+
+import click
+from utils.db import engine, SessionLocal
+from .retention import convert_to_partitioned, ensure_monthly_partitions, archive_expired
+
+@click.group()
+def cli():
+    """Notification Service admin CLI"""
+    pass
+
+@cli.command("partition")
+def partition():
+    """Convert notifications to monthly partitions (PostgreSQL, one-off)."""
+    convert_to_partitioned(engine)
+    months = ensure_monthly_partitions(engine)
+    if months:
+        click.secho(f"✅ Partitions ensured for {months} months", fg="green")
+
+@cli.command("archive")
+@click.option("--days", type=int, default=None, help="Retention window in days")
+@click.option("--batch-size", type=int, default=None, help="Rows per transaction")
+def archive(days, batch_size):
+    """Archive and purge notifications older than the retention window."""
+    result = archive_expired(SessionLocal, retention_days=days, batch_size=batch_size)
+    click.secho(
+        f"✅ Archived {result['archived']} notifications in {result['batches']} batches "
+        f"(older than {result['cutoff']:%Y-%m-%d})",
+        fg="green"
+    )
+
+if __name__ == "__main__":
+    cli()
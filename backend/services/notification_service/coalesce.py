@@ -0,0 +1,121 @@
+"""
+Per-user coalescing of instant notifications.
+
+Notifications of the same type for the same user are buffered and flushed
+as one combined email once no new one has arrived for
+COALESCE_WINDOW_SECONDS, or COALESCE_MAX_DELAY_SECONDS after the first,
+whichever comes first.
+
+Each buffer has a flush marker, set while a flush task is scheduled for
+it. A push that finds no marker schedules one. If a flush is lost (a
+worker died holding it), its marker expires and the next notification
+reschedules the flush. Buffered items are never expired away.
+
+Without Redis the buffer lives in one process's memory. That only works
+when the flush runs in the same process as the pushes: eager mode, or
+the solo/threads/gevent pools. Prefork children refuse it.
+"""
+import json
+import threading
+from celery.signals import worker_process_init
+from utils.config import COALESCE_WINDOW_SECONDS, COALESCE_MAX_DELAY_SECONDS
+from utils.redis_client import get_redis
+
+# A scheduled flush runs within the window, or reschedules itself (renewing
+# the marker); a marker older than this belongs to a lost flush
+MARKER_TTL = int(COALESCE_WINDOW_SECONDS + COALESCE_MAX_DELAY_SECONDS) + 60
+
+class RedisBuffer:
+    """Buffers shared by all workers, one Redis list per (user, type)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def push(self, key, item):
+        """Append an item; returns (buffer length, whether the caller must schedule a flush)"""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(key, json.dumps(item))
+        pipe.set(f"{key}:flush", 1, nx=True, ex=MARKER_TTL)
+        length, claimed = pipe.execute()
+        return length, bool(claimed)
+
+    def renew(self, key):
+        """Keep the flush marker while a flush reschedules itself"""
+        self.client.set(f"{key}:flush", 1, ex=MARKER_TTL)
+
+    def peek(self, key):
+        return [json.loads(item) for item in self.client.lrange(key, 0, -1)]
+
+    def take(self, key):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrange(key, 0, -1)
+        pipe.delete(key, f"{key}:flush")
+        items, _ = pipe.execute()
+        return [json.loads(item) for item in items]
+
+class LocalBuffer:
+    """In-process stand-in; only coalesces within one worker process"""
+
+    def __init__(self):
+        self._lists = {}
+        self._scheduled = set()
+        self._lock = threading.Lock()
+
+    def push(self, key, item):
+        with self._lock:
+            items = self._lists.setdefault(key, [])
+            items.append(item)
+            claimed = key not in self._scheduled
+            self._scheduled.add(key)
+            return len(items), claimed
+
+    def renew(self, key):
+        pass
+
+    def peek(self, key):
+        with self._lock:
+            return list(self._lists.get(key, ()))
+
+    def take(self, key):
+        with self._lock:
+            self._scheduled.discard(key)
+            return self._lists.pop(key, [])
+
+_buffer = None
+_pool_child = False
+
+@worker_process_init.connect
+def _in_pool_child(**kwargs):
+    """Only prefork starts pool child processes"""
+    global _pool_child
+    _pool_child = True
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        client = get_redis()
+        if client is None and _pool_child:
+            raise RuntimeError(
+                "Coalescing needs Redis under the prefork pool: each child would buffer alone. "
+                "Set REDIS_URL, run a solo/threads/gevent pool, or set COALESCE_WINDOW_SECONDS=0."
+            )
+        _buffer = RedisBuffer(client) if client is not None else LocalBuffer()
+    return _buffer
+
+def buffer_key(user_id, notification_type):
+    return f"coalesce:{int(user_id)}:{notification_type}"
+
+def flush_delay(items, now):
+    """Seconds until a buffer is due; zero or less means flush now"""
+    quiet_until = items[-1]["at"] + COALESCE_WINDOW_SECONDS
+    deadline = items[0]["at"] + COALESCE_MAX_DELAY_SECONDS
+    return min(quiet_until, deadline) - now
+
+def combine(items):
+    """Title and body for one email summarising a burst"""
+    if len(items) == 1:
+        return items[0]["title"], items[0]["message"]
+
+    title = f"You have {len(items)} new notifications"
+    message = "\n\n".join(f"• {item['title']}\n  {item['message']}" for item in items)
+    return title, message
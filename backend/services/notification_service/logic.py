@@ -1,21 +1,297 @@
+import base64
+from collections import Counter
 from datetime import datetime, timedelta
+from sqlalchemy import and_, bindparam, case, func, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from services.task_service.models import Task
 from services.user_service.models import User
+from utils.config import NOTIFICATION_MAX_ATTEMPTS
 from utils.db import SessionLocal
-from .models import Notification
+from .models import Notification, UnreadCounter
 
-def get_due_soon(session):
+def due_soon_query(session):
     now = datetime.utcnow() + timedelta(hours=7)
     in_one_hour = now + timedelta(hours=1)
     return session.query(Task).filter(
         Task.completed == False,
         Task.due_date >= now,
         Task.due_date <= in_one_hour
-    ).all()
+    )
 
-def get_overdue(session):
+def overdue_query(session):
     now = datetime.utcnow() + timedelta(hours=7)
     return session.query(Task).filter(
         Task.completed == False,
         Task.due_date < now
+    )
+
+def get_due_soon(session):
+    return due_soon_query(session).all()
+
+def get_overdue(session):
+    return overdue_query(session).all()
+
+# Kinds whose rows are record_pending's only memory of "already sent"; retention keeps them
+DEDUPE_NOTIFY_TYPES = ("due_soon", "overdue")
+
+def notified_query(session, task_ids, notify_type):
+    """Ids among ``task_ids`` that already have a ``notify_type`` notification"""
+    return session.query(Notification.task_id).filter(
+        Notification.notify_type == notify_type,
+        Notification.task_id.in_(task_ids)
+    )
+
+
+def digest_rows_page(session, after_user_id, before, limit):
+    """Digest rows for the next ``limit`` users after ``after_user_id``.
+
+    One query returns a row per (user, open task due before ``before``),
+    ordered by user; users without such tasks get a single row with a NULL
+    title, so every user shows up exactly once as a consecutive group.
+    """
+    next_users = session.query(User.id).filter(
+        User.id > after_user_id
+    ).order_by(User.id).limit(limit).subquery()
+
+    return session.query(
+        User.id, User.username, User.email, Task.title, Task.due_date
+    ).outerjoin(Task, and_(
+        Task.user_id == User.id,
+        Task.completed == False,
+        Task.due_date < before
+    )).filter(
+        User.id.in_(select(next_users.c.id))
+    ).order_by(User.id).all()
+
+def record_pending(session, tasks, notify_type, render):
+    """Record a pending notification for every task not yet notified.
+
+    Only writes rows, it never talks to SMTP, so a scheduled scan finishes
+    quickly and the actual sending is left to the delivery stage. ``render``
+    maps a task to its ``(title, message)``. Returns the new, flushed
+    Notification rows.
+    """
+    if not tasks:
+        return []
+
+    already_notified = {
+        task_id for (task_id,) in notified_query(session, [task.id for task in tasks], notify_type)
+    }
+
+    now = datetime.utcnow()
+    pending = []
+    for task in tasks:
+        if task.id in already_notified or task.owner is None:
+            continue
+        title, message = render(task)
+        pending.append(Notification(
+            task_id=task.id,
+            user_id=task.user_id,
+            notify_type=notify_type,
+            title=title,
+            message=message,
+            status="pending",
+            queued_at=now
+        ))
+
+    session.add_all(pending)
+    add_unread(session, [notification.user_id for notification in pending])
+    session.flush()
+    return pending
+
+def add_unread(session, user_ids):
+    """Bump the unread counter once per new notification for each user id.
+
+    Must run in the same transaction as the notification inserts so the
+    counter never drifts from the rows.
+    """
+    increments = Counter(int(user_id) for user_id in user_ids)
+    if not increments:
+        return
+
+    insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(UnreadCounter)
+    # One executemany upsert for all users, however many there are
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UnreadCounter.user_id],
+            set_={"unread_count": UnreadCounter.unread_count + stmt.excluded.unread_count}
+        ),
+        [{"user_id": user_id, "unread_count": count} for user_id, count in increments.items()]
+    )
+
+def remove_unread(session, user_ids):
+    """Take the counter down once per id for each user id, never below zero"""
+    decrements = Counter(int(user_id) for user_id in user_ids)
+    if not decrements:
+        return
+
+    counters = UnreadCounter.__table__
+    count = counters.c.unread_count
+    session.execute(
+        counters.update().where(counters.c.user_id == bindparam("counter_user")).values(
+            unread_count=case((count > bindparam("by"), count - bindparam("by")), else_=0)
+        ),
+        [{"counter_user": user_id, "by": by} for user_id, by in decrements.items()]
+    )
+
+def rebuild_unread(session, user_ids):
+    """Recount the unread counter of each user from the notification rows"""
+    user_ids = sorted({int(user_id) for user_id in user_ids})
+    if not user_ids:
+        return
+    unread = select(func.count(Notification.id)).where(
+        Notification.user_id == UnreadCounter.user_id,
+        Notification.read == False,
+        Notification.status != "failed"
+    ).scalar_subquery()
+    session.query(UnreadCounter).filter(
+        UnreadCounter.user_id.in_(user_ids)
+    ).update({"unread_count": unread}, synchronize_session=False)
+
+def get_unread_count(session, user_id):
+    counter = session.get(UnreadCounter, int(user_id))
+    return counter.unread_count if counter else 0
+
+def mark_failed(session, notification_ids):
+    """Mark notifications failed and count the attempt; the unread ones stop counting as unread"""
+    if not notification_ids:
+        return
+    rows = session.execute(
+        update(Notification).where(
+            Notification.id.in_(notification_ids),
+            Notification.status != "failed"
+        ).values(
+            status="failed", attempts=Notification.attempts + 1
+        ).returning(Notification.user_id, Notification.read),
+        execution_options={"synchronize_session": False}
+    ).all()
+    remove_unread(session, [user_id for user_id, read in rows if not read])
+
+def claim_for_delivery(session, notification_ids):
+    """Move the still-pending rows among ``notification_ids`` to 'sending'; returns the claimed rows.
+
+    Only one delivery can win a row, so a second message for it (say, a
+    redelivery of one that was only slow) finds nothing left to send.
+    """
+    if not notification_ids:
+        return []
+    return session.execute(
+        update(Notification).where(
+            Notification.id.in_(notification_ids),
+            Notification.status == "pending"
+        ).values(status="sending", queued_at=datetime.utcnow()).returning(
+            Notification.id, Notification.user_id, Notification.title, Notification.message
+        ),
+        execution_options={"synchronize_session": False}
+    ).all()
+
+def claim_redelivery(session, status, queued_before, limit):
+    """Put up to ``limit`` ``status`` rows last queued before ``queued_before`` back in line.
+
+    Pending rows are ones whose delivery message was lost, and 'sending'
+    rows ones whose worker died mid-send. Failed rows are retried while
+    they have attempts left, and count as unread again. The
+    claim is one conditional UPDATE, so overlapping sweeps never take the
+    same row. Returns the ids, which the caller must dispatch after commit.
+    """
+    stale = and_(
+        Notification.status == status,
+        or_(Notification.queued_at.is_(None), Notification.queued_at < queued_before)
+    )
+    if status == "failed":
+        stale = and_(stale, Notification.attempts < NOTIFICATION_MAX_ATTEMPTS)
+    candidates = select(Notification.id).where(stale).order_by(Notification.id).limit(limit)
+
+    rows = session.execute(
+        update(Notification).where(Notification.id.in_(candidates), stale).values(
+            status="pending", queued_at=datetime.utcnow()
+        ).returning(Notification.id, Notification.user_id, Notification.read),
+        execution_options={"synchronize_session": False}
     ).all()
+    if status == "failed":
+        add_unread(session, [user_id for _, user_id, read in rows if not read])
+    return sorted(notification_id for notification_id, _, _ in rows)
+
+def mark_read(session, user_id, notification_id):
+    """Mark one notification read; returns False if it does not belong to the user"""
+    status = session.execute(
+        update(Notification).where(
+            Notification.id == notification_id,
+            Notification.user_id == user_id,
+            Notification.read == False
+        ).values(read=True).returning(Notification.status),
+        execution_options={"synchronize_session": False}
+    ).scalar()
+
+    if status is not None:
+        if status != "failed":  # Failed rows were never counted
+            remove_unread(session, [user_id])
+        return True
+
+    return session.query(Notification.id).filter_by(id=notification_id, user_id=user_id).first() is not None
+
+def mark_all_read(session, user_id):
+    """Mark every unread notification of a user read with set-based updates"""
+    unread = session.query(Notification).filter(
+        Notification.user_id == user_id,
+        Notification.read == False
+    )
+    counted = unread.filter(Notification.status != "failed").update(
+        {"read": True}, synchronize_session=False
+    )
+    # Only what this call marked comes off the counter, so concurrent inserts still count
+    remove_unread(session, [user_id] * counted)
+    return counted + unread.update({"read": True}, synchronize_session=False)
+
+def encode_cursor(notification):
+    """Opaque page cursor for a notification's position in (sent_at, id) order"""
+    raw = f"{notification.sent_at.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor(); raises ValueError for anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        sent_at, notification_id = raw.split("|")
+        return datetime.fromisoformat(sent_at), int(notification_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def notifications_page(session, user_id, limit, before=None, after=None, notify_type=None, task_id=None):
+    """One page of a user's notifications, newest first, by keyset on (sent_at, id).
+
+    ``before`` pages towards older rows and ``after`` towards newer ones. Both
+    take a decoded cursor. The page is an index range scan that starts at the
+    cursor, so it costs the same at any depth. Returns ``(rows, older, newer)``:
+    ``older`` is the cursor for the next older page, or None at the end of the
+    history; ``newer`` points just above the page and is kept even when
+    nothing newer exists yet, so clients can poll it for new notifications.
+    """
+    query = session.query(Notification).filter(Notification.user_id == user_id)
+    if notify_type is not None:
+        query = query.filter(Notification.notify_type == notify_type)
+    if task_id is not None:
+        query = query.filter(Notification.task_id == task_id)
+
+    position = tuple_(Notification.sent_at, Notification.id)
+    if after is not None:
+        # Walk upwards from the cursor, then flip so the page still reads newest first
+        rows = query.filter(position > tuple_(*after)).order_by(
+            Notification.sent_at.asc(), Notification.id.asc()
+        ).limit(limit).all()[::-1]
+        has_more_older = True
+    else:
+        if before is not None:
+            query = query.filter(position < tuple_(*before))
+        rows = query.order_by(
+            Notification.sent_at.desc(), Notification.id.desc()
+        ).limit(limit + 1).all()
+        has_more_older = len(rows) > limit
+        rows = rows[:limit]
+
+    if not rows:
+        return rows, None, None
+    older = encode_cursor(rows[-1]) if has_more_older else None
+    return rows, older, encode_cursor(rows[0])
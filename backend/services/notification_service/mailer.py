@@ -1,14 +1,162 @@
+import os
 import smtplib
+import threading
+import time
+from contextlib import contextmanager
 from email.mime.text import MIMEText
-from utils.config import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, EMAIL_FROM
+from queue import LifoQueue, Empty
+from utils.config import (
+    SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_USE_TLS, EMAIL_FROM,
+    SMTP_POOL_SIZE, SMTP_MAX_MESSAGES_PER_CONNECTION, SMTP_NOOP_INTERVAL
+)
+from .throttle import reserve, Deferred
 
-def send_email(to_addr: str, subject: str, body: str):
+def build_message(to_addr: str, subject: str, body: str) -> MIMEText:
     msg = MIMEText(body)
     msg["Subject"] = subject
     msg["From"]    = EMAIL_FROM
     msg["To"]      = to_addr
+    return msg
+
+class _PooledConnection:
+    """An authenticated SMTP session plus the bookkeeping the pool needs"""
+
+    def __init__(self, host, port):
+        self.smtp = smtplib.SMTP(host, port)
+        if SMTP_USE_TLS:
+            self.smtp.starttls()
+        if SMTP_USERNAME:
+            self.smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+    def is_healthy(self) -> bool:
+        if self.messages_sent >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+            return False
+        if time.monotonic() - self.last_used < SMTP_NOOP_INTERVAL:
+            return True
+        # Idle for a while: the server may have dropped us, ask before reusing
+        try:
+            return self.smtp.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+class SMTPConnectionPool:
+    """Keep-alive SMTP sessions shared by every task in one worker process.
+
+    Sessions are handed out LIFO so the warmest one is reused first, checked
+    with NOOP after SMTP_NOOP_INTERVAL seconds idle, and recycled after
+    SMTP_MAX_MESSAGES_PER_CONNECTION messages.
+    """
+
+    def __init__(self, host=None, port=None, size=None):
+        self.host = host or SMTP_SERVER
+        self.port = port or SMTP_PORT
+        self.size = size or SMTP_POOL_SIZE
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _checkout(self) -> _PooledConnection:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                return _PooledConnection(self.host, self.port)
+            if conn.is_healthy():
+                return conn
+            conn.close()
 
-    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as smtp:
-        smtp.starttls()
-        smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
-        smtp.send_message(msg)
+    @contextmanager
+    def connection(self):
+        """Borrow a session; it goes back to the pool unless it raised"""
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+            conn.last_used = time.monotonic()
+            self._idle.put(conn)
+        except Exception:
+            if conn is not None:
+                conn.close()
+            raise
+        finally:
+            self._slots.release()
+
+    def send_many(self, messages, max_wait=None):
+        """Send ``(to_addr, subject, body)`` tuples over one pooled session.
+
+        Returns one entry per message: None when accepted, otherwise the error
+        text, or a ``throttle.Deferred`` when the rate-limit slot is more than
+        ``max_wait`` seconds away. A dropped connection is re-opened once and
+        the remaining messages carry on over the new session.
+        """
+        results = [None] * len(messages)
+        position = 0
+        booked = 0
+        reconnected = False
+        while position < len(messages):
+            try:
+                with self.connection() as conn:
+                    while position < len(messages):
+                        if conn.messages_sent >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+                            break
+                        to_addr, subject, body = messages[position]
+                        if booked <= position:
+                            wait = reserve(to_addr, max_wait)
+                            booked = position + 1
+                            if isinstance(wait, Deferred):
+                                results[position] = wait
+                                position += 1
+                                continue
+                            if wait > 0:
+                                time.sleep(wait)
+                        try:
+                            conn.smtp.send_message(build_message(to_addr, subject, body))
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError,
+                                smtplib.SMTPSenderRefused) as e:
+                            # Rejected message, but the session itself is still usable
+                            results[position] = str(e)
+                        conn.messages_sent += 1
+                        position += 1
+            except (smtplib.SMTPException, OSError) as e:
+                if reconnected:
+                    for i in range(position, len(messages)):
+                        results[i] = str(e)
+                    break
+                reconnected = True
+        return results
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> SMTPConnectionPool:
+    """Return this process's pool; a forked worker child builds its own"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = SMTPConnectionPool()
+            _pool_pid = os.getpid()
+        return _pool
+
+def send_many(messages, max_wait=None):
+    return get_pool().send_many(messages, max_wait)
+
+def send_email(to_addr: str, subject: str, body: str):
+    error = send_many([(to_addr, subject, body)])[0]
+    if error is not None:
+        raise smtplib.SMTPException(error)
@@ -1,14 +1,47 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Date, Text, Boolean, Index
 from utils.db import Base
 
 class Notification(Base):
     __tablename__ = "notifications"
 
     id          = Column(Integer, primary_key=True, index=True)
-    task_id     = Column(Integer, nullable=True, index=True)  # Allow null for non-task notifications
-    user_id     = Column(Integer, nullable=False, index=True)
+    task_id     = Column(Integer, nullable=True)  # Allow null for non-task notifications; indexed with notify_type below
+    user_id     = Column(Integer, nullable=False)  # Indexed together with sent_at below
     notify_type = Column(String, nullable=False)  # 'due_soon', 'overdue', 'task_completed', 'info', etc.
     title       = Column(String, nullable=True)   # Notification title
     message     = Column(Text, nullable=True)     # Notification message content
-    sent_at     = Column(DateTime, default=datetime.utcnow)
+    sent_at     = Column(DateTime, nullable=False, default=datetime.utcnow)  # Partition key on Postgres
+    status      = Column(String, nullable=False, default="sent")  # 'pending', 'sending' while a worker holds it, then 'sent' or 'failed'
+    read        = Column(Boolean, nullable=False, default=False)
+    attempts    = Column(Integer, nullable=False, default=0)  # Failed deliveries so far
+    queued_at   = Column(DateTime, nullable=True)  # Last handed to delivery; set while pending or failed
+    delivered_at = Column(DateTime, nullable=True)  # When a pending row was sent; rows stored after sending keep it NULL
+
+# Keyset pagination over (sent_at, id): each history page is one index range scan
+Index("ix_notifications_user_sent_at_id",
+      Notification.user_id, Notification.sent_at.desc(), Notification.id.desc())
+Index("ix_notifications_user_type_sent_at_id",
+      Notification.user_id, Notification.notify_type, Notification.sent_at.desc(), Notification.id.desc())
+# Dedupe in record_pending: has this task already had this kind of notification?
+Index("ix_notifications_task_id_notify_type", Notification.task_id, Notification.notify_type)
+# Redelivery sweep: only the few rows not yet sent
+Index("ix_notifications_undelivered", Notification.status, Notification.queued_at,
+      postgresql_where=Notification.status != "sent", sqlite_where=Notification.status != "sent")
+
+class UnreadCounter(Base):
+    __tablename__ = "notification_unread_counters"
+
+    user_id      = Column(Integer, primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)  # Unread notifications not marked failed; kept in step on every write
+
+
+class DigestCheckpoint(Base):
+    __tablename__ = "digest_checkpoints"
+
+    run_date        = Column(Date, primary_key=True)               # One row per daily digest run
+    last_user_id    = Column(Integer, nullable=False, default=0)   # Users up to this id have been handed to the mailer
+    users_processed = Column(Integer, nullable=False, default=0)
+    finished_at     = Column(DateTime, nullable=True)              # Set once the run has covered every user
+    lease_owner     = Column(String, nullable=True)                # Run currently paging users, if any
+    lease_until     = Column(DateTime, nullable=True)              # Renewed every chunk; after it the run is presumed dead
@@ -0,0 +1,219 @@
+"""
+Retention for the notifications table: monthly partitions on Postgres and a
+batched archive-and-purge job for rows older than the retention window
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import and_, exists, text
+from sqlalchemy.schema import CreateIndex
+from utils.config import (
+    NOTIFICATION_RETENTION_DAYS, NOTIFICATION_ARCHIVE_DIR,
+    NOTIFICATION_ARCHIVE_BATCH, NOTIFICATION_PARTITION_MONTHS_AHEAD
+)
+from services.task_service.models import Task
+from .logic import DEDUPE_NOTIFY_TYPES, rebuild_unread
+from .models import Notification
+
+TABLE = "notifications"
+
+def _month_start(day):
+    return datetime(day.year, day.month, 1)
+
+def _next_month(month):
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def _partition_name(month):
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+def is_partitioned(conn):
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :name"
+    ), {"name": TABLE}).first() is not None
+
+def _create_partition(conn, month):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+    ))
+
+def ensure_monthly_partitions(engine, months_ahead=None):
+    """Create partitions for the current month and the next few (Postgres only).
+
+    Returns the number of months checked, or 0 where partitioning does not
+    apply. Run regularly so inserts never land in the default partition.
+    """
+    if engine.dialect.name != "postgresql":
+        return 0
+    months_ahead = NOTIFICATION_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return 0
+        month = _month_start(datetime.utcnow())
+        for _ in range(months_ahead + 1):
+            _create_partition(conn, month)
+            month = _next_month(month)
+    return months_ahead + 1
+
+def convert_to_partitioned(engine):
+    """One-off: rebuild notifications as a table partitioned by month of sent_at.
+
+    Postgres requires the partition key in the primary key, so the new
+    table's key is (id, sent_at); ids keep coming from the same sequence.
+    Runs in a single transaction. Schedule it in a quiet window, because
+    it copies every row.
+    """
+    if engine.dialect.name != "postgresql":
+        print("ℹ️  Partitioning only applies to PostgreSQL; nothing to do")
+        return False
+
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            print("ℹ️  notifications is already partitioned")
+            return False
+
+        oldest = conn.execute(text(f"SELECT min(sent_at) FROM {TABLE}")).scalar() or datetime.utcnow()
+
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned"))
+        # Free the index names (including the primary key's) for the new table
+        for index in conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = :name"
+        ), {"name": f"{TABLE}_unpartitioned"}).scalars().all():
+            conn.execute(text(f"ALTER INDEX {index} RENAME TO {index}_old"))
+        conn.execute(text(
+            f"UPDATE {TABLE}_unpartitioned SET sent_at = now() AT TIME ZONE 'utc' WHERE sent_at IS NULL"
+        ))
+
+        conn.execute(text(
+            f"CREATE TABLE {TABLE} (LIKE {TABLE}_unpartitioned INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (sent_at)"
+        ))
+        conn.execute(text(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, sent_at)"))
+        # Every index the model declares (keyset history pages, dedupe, redelivery),
+        # so the rebuilt table cannot drift from what migrations create
+        for index in Notification.__table__.indexes:
+            conn.execute(CreateIndex(index))
+        conn.execute(text(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT"))
+
+        month = _month_start(oldest)
+        last = _month_start(datetime.utcnow())
+        for _ in range(NOTIFICATION_PARTITION_MONTHS_AHEAD):
+            last = _next_month(last)
+        while month <= last:
+            _create_partition(conn, month)
+            month = _next_month(month)
+
+        conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_unpartitioned"))
+        conn.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id"))
+        conn.execute(text(f"DROP TABLE {TABLE}_unpartitioned"))
+
+    print("✅ notifications is now partitioned by month of sent_at")
+    return True
+
+def drop_expired_partitions(engine, cutoff):
+    """Drop monthly partitions that lie entirely before ``cutoff`` and are empty"""
+    if engine.dialect.name != "postgresql":
+        return []
+
+    dropped = []
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return []
+        partitions = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :name"
+        ), {"name": TABLE}).scalars().all()
+
+        for name in partitions:
+            try:
+                year, month = name[len(TABLE) + 2:].split("m")
+                upper = _next_month(datetime(int(year), int(month), 1))
+            except ValueError:
+                continue  # the default partition
+            if upper > cutoff:
+                continue
+            if conn.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None:
+                conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+    return dropped
+
+def _archive_record(n):
+    return {
+        "id": n.id,
+        "task_id": n.task_id,
+        "user_id": n.user_id,
+        "notify_type": n.notify_type,
+        "title": n.title,
+        "message": n.message,
+        "sent_at": n.sent_at.isoformat(),
+        "delivered_at": n.delivered_at.isoformat() if n.delivered_at else None,
+        "status": n.status,
+        "read": n.read
+    }
+
+def archive_expired(session_factory, retention_days=None, batch_size=None, archive_dir=None):
+    """Move notifications older than the retention window into gzip archives.
+
+    Works in small transactions: each batch is appended to
+    ``<archive_dir>/notifications-YYYY-MM.jsonl.gz`` and then deleted. A
+    crash between the two steps can repeat a batch in the archive but never
+    loses rows.
+
+    Due-soon/overdue rows of tasks that are still open are kept, because
+    they are what stops the scans from notifying those tasks again. The
+    unread counters of the affected users are recounted once at the end.
+    """
+    retention_days = retention_days or NOTIFICATION_RETENTION_DAYS
+    batch_size = batch_size or NOTIFICATION_ARCHIVE_BATCH
+    archive_dir = archive_dir or NOTIFICATION_ARCHIVE_DIR
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    archived = 0
+    batches = 0
+    touched_users = set()
+    still_deduping = and_(
+        Notification.notify_type.in_(DEDUPE_NOTIFY_TYPES),
+        exists().where(Task.id == Notification.task_id, Task.completed == False)
+    )
+    while True:
+        db = session_factory()
+        try:
+            rows = db.query(Notification).filter(
+                Notification.sent_at < cutoff, ~still_deduping
+            ).order_by(Notification.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            by_month = {}
+            for n in rows:
+                by_month.setdefault(f"{n.sent_at:%Y-%m}", []).append(_archive_record(n))
+            for month, records in by_month.items():
+                # gzip members can be appended; readers see one continuous stream
+                path = os.path.join(archive_dir, f"{TABLE}-{month}.jsonl.gz")
+                with gzip.open(path, "at", encoding="utf-8") as archive:
+                    archive.writelines(json.dumps(record) + "\n" for record in records)
+
+            touched_users.update(n.user_id for n in rows if not n.read)
+            db.query(Notification).filter(
+                Notification.id.in_([n.id for n in rows])
+            ).delete(synchronize_session=False)
+            db.commit()
+
+            archived += len(rows)
+            batches += 1
+        finally:
+            db.close()
+
+    db = session_factory()
+    try:
+        rebuild_unread(db, touched_users)
+        db.commit()
+    finally:
+        db.close()
+
+    return {"archived": archived, "batches": batches, "cutoff": cutoff}
@@ -0,0 +1,19 @@
+"""
+Production entrypoint for the notification API.
+
+Serves the Flask app on gevent, so every open /notifications/stream
+connection costs a greenlet instead of an OS thread and one process can
+hold thousands of idle streams. Monkey patching must happen before anything
+else is imported.
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import os
+from gevent.pywsgi import WSGIServer
+from .api import app
+
+if __name__ == "__main__":
+    port = int(os.getenv("PORT", 5003))
+    print(f"🚀 Notification service (gevent) listening on :{port}")
+    WSGIServer(("0.0.0.0", port), app, log=None).serve_forever()
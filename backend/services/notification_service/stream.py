@@ -0,0 +1,80 @@
+"""
+Live notification push: publishing from tasks and the SSE event stream
+"""
+import json
+from utils.config import SSE_HEARTBEAT_SECONDS, SSE_BACKLOG_LIMIT
+from utils.db import SessionLocal
+from utils.pubsub import get_hub
+from .models import Notification
+
+def serialize(n):
+    """The notification shape shared by GET /notifications and the stream"""
+    return {
+        "id": n.id,
+        "title": n.title or f"Notification ({n.notify_type})",
+        "message": n.message or "No message",
+        "type": n.notify_type,
+        "task_id": n.task_id,
+        "sent_at": n.sent_at.isoformat(),
+        "read": bool(n.read)
+    }
+
+def user_channel(user_id):
+    return f"notifications:user:{int(user_id)}"
+
+def publish_notifications(payloads):
+    """Push serialized notifications to their users' streams.
+
+    Call after the rows are committed. A failed publish never fails the
+    task: clients catch up from the database on reconnect.
+    """
+    hub = get_hub()
+    for payload in payloads:
+        try:
+            hub.publish(user_channel(payload["user_id"]), payload)
+        except Exception as e:
+            print(f"⚠️ Could not publish notification {payload['id']}: {e}")
+
+def stream_payloads(notifications):
+    """Serialize freshly flushed notifications for publish_notifications()"""
+    return [dict(serialize(n), user_id=n.user_id) for n in notifications]
+
+def _event(payload):
+    return f"id: {payload['id']}\nevent: notification\ndata: {json.dumps(payload)}\n\n"
+
+def event_stream(user_id, last_event_id=None):
+    """Yield SSE frames for one user: missed notifications first, then live ones.
+
+    The subscription is opened before the backlog query so nothing slips
+    through in between; live events already covered by the backlog are
+    skipped by id. No database session is held while idling.
+    """
+    with get_hub().subscribe(user_channel(user_id)) as subscription:
+        yield "retry: 3000\n\n"
+
+        last_sent = int(last_event_id) if last_event_id else None
+        if last_sent is not None:
+            db = SessionLocal()
+            try:
+                missed = db.query(Notification).filter(
+                    Notification.user_id == user_id,
+                    Notification.id > last_sent
+                ).order_by(Notification.id).limit(SSE_BACKLOG_LIMIT).all()
+                backlog = [serialize(n) for n in missed]
+            finally:
+                db.close()
+            for payload in backlog:
+                last_sent = payload["id"]
+                yield _event(payload)
+
+        while not subscription.overflowed:
+            payload = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+            if payload is None:
+                yield ": heartbeat\n\n"
+                continue
+            if last_sent is not None and payload["id"] <= last_sent:
+                continue
+            # The same dict is shared by every local subscriber of this user
+            last_sent = payload["id"]
+            yield _event({key: value for key, value in payload.items() if key != "user_id"})
+        # Fell behind: end the stream so the client reconnects with Last-Event-ID
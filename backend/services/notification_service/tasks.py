@@ -1,21 +1,41 @@
 """
 Notification service async tasks - Real broker integration examples
 """
+from celery import group
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
 from utils.broker import app
-from utils.db import SessionLocal
-from .models import Notification
+from utils.config import (
+    NOTIFICATION_DELIVERY_CHUNK_SIZE, NOTIFICATION_DELIVERY_MAX_PARALLEL, DIGEST_CHUNK_SIZE, DIGEST_LEASE_SECONDS,
+    COALESCE_WINDOW_SECONDS, BULK_NOTIFICATION_CHUNK_SIZE, NOTIFICATION_REDISPATCH_AFTER_SECONDS,
+    NOTIFICATION_RETRY_AFTER_SECONDS, NOTIFICATION_REDELIVERY_BATCH
+)
+from utils.db import SessionLocal, engine
+from utils.entity_cache import cached_user, load_task
+from .models import Notification, DigestCheckpoint
 from services.user_service.models import User
 from services.task_service.models import Task
-from .logic import get_due_soon, get_overdue
+from .logic import (
+    get_due_soon, get_overdue, record_pending, digest_rows_page, add_unread, mark_failed,
+    claim_for_delivery, claim_redelivery
+)
 from .mailer import send_email
+from .async_mailer import deliver
+from .throttle import Deferred, earliest_retry
+from .stream import stream_payloads, publish_notifications
+from .retention import ensure_monthly_partitions, archive_expired, drop_expired_partitions
+from .coalesce import get_buffer, buffer_key, flush_delay, combine
 from datetime import datetime, timedelta
+from itertools import groupby
+from types import SimpleNamespace
+import time
+import uuid
 
-@app.task(name='tasks.notification.send_instant_notification')
-def send_instant_notification(user_id, title, message, notification_type="info"):
-    """Send instant notification to user (triggered by user actions)"""
+def deliver_instant(user_id, title, message, notification_type):
+    """Email the user and store the notification record"""
     db = SessionLocal()
     try:
-        user = db.query(User).get(user_id)
+        user = cached_user(db, user_id)
         if not user:
             return {"status": "error", "message": "User not found"}
         
@@ -34,7 +54,11 @@ def send_instant_notification(user_id, title, message, notification_type="info")
             sent_at=datetime.utcnow()
         )
         db.add(notification)
+        add_unread(db, [user_id])
+        db.flush()
+        payloads = stream_payloads([notification])
         db.commit()
+        publish_notifications(payloads)
         
         return {
             "status": "success",
@@ -45,16 +69,71 @@ def send_instant_notification(user_id, title, message, notification_type="info")
     finally:
         db.close()
 
+@app.task(name='tasks.notification.send_instant_notification')
+def send_instant_notification(user_id, title, message, notification_type="info"):
+    """Send instant notification to user (triggered by user actions)
+
+    With a coalescing window configured, the notification is buffered and
+    a burst for the same user and type goes out as one combined email.
+    """
+    if COALESCE_WINDOW_SECONDS <= 0:
+        return deliver_instant(user_id, title, message, notification_type)
+    
+    buffered, schedule = get_buffer().push(buffer_key(user_id, notification_type), {
+        "title": title,
+        "message": message,
+        "at": time.time()
+    })
+    if schedule:
+        # No flush pending (a new burst, or the last flush was lost): schedule one
+        flush_coalesced_notifications.apply_async(
+            (user_id, notification_type), countdown=COALESCE_WINDOW_SECONDS
+        )
+    
+    return {
+        "status": "buffered",
+        "user_id": user_id,
+        "notification_type": notification_type,
+        "buffered": buffered
+    }
+
+@app.task(bind=True, name='tasks.notification.flush_coalesced_notifications')
+def flush_coalesced_notifications(self, user_id, notification_type):
+    """Send one combined email and record for a buffered burst of notifications"""
+    buffer = get_buffer()
+    key = buffer_key(user_id, notification_type)
+    
+    items = buffer.peek(key)
+    if not items:
+        return {"status": "empty", "user_id": user_id}
+    
+    # Still inside the window: check back when it closes (eager runs cannot wait)
+    wait = flush_delay(items, time.time())
+    if wait > 0 and not self.request.is_eager:
+        buffer.renew(key)
+        flush_coalesced_notifications.apply_async((user_id, notification_type), countdown=wait)
+        return {"status": "deferred", "user_id": user_id, "seconds": wait}
+    
+    items = buffer.take(key)
+    if not items:
+        return {"status": "empty", "user_id": user_id}
+    
+    title, message = combine(items)
+    result = deliver_instant(user_id, title, message, notification_type)
+    result["coalesced"] = len(items)
+    print(f"🧺 Flushed {len(items)} coalesced '{notification_type}' notifications for user {user_id}")
+    return result
+
 @app.task(name='tasks.notification.send_task_completion_notification')
-def send_task_completion_notification(task_id):
+def send_task_completion_notification(task_id, snapshot=None):
     """Send notification when a task is completed"""
     db = SessionLocal()
     try:
-        task = db.query(Task).get(task_id)
+        task = load_task(db, task_id, snapshot)
         if not task:
             return {"status": "error", "message": "Task not found"}
         
-        user = db.query(User).get(task.user_id)
+        user = cached_user(db, task.user_id)
         if not user:
             return {"status": "error", "message": "User not found"}
         
@@ -82,7 +161,11 @@ def send_task_completion_notification(task_id):
             sent_at=datetime.utcnow()
         )
         db.add(notification)
+        add_unread(db, [user.id])
+        db.flush()
+        payloads = stream_payloads([notification])
         db.commit()
+        publish_notifications(payloads)
         
         return {
             "status": "success",
@@ -92,38 +175,35 @@ def send_task_completion_notification(task_id):
     finally:
         db.close()
 
-@app.task(name='tasks.notification.send_daily_digest')
-def send_daily_digest(user_id):
-    """Send daily digest of tasks to user"""
-    db = SessionLocal()
-    try:
-        user = db.query(User).get(user_id)
-        if not user:
-            return {"status": "error", "message": "User not found"}
-        
-        # Get user's tasks for digest
-        today = datetime.utcnow().date()
-        tomorrow = today + timedelta(days=1)
-        
-        due_today = db.query(Task).filter(
-            Task.user_id == user_id,
-            Task.due_date >= today,
-            Task.due_date < tomorrow,
-            Task.completed == False
-        ).all()
-        
-        overdue = db.query(Task).filter(
-            Task.user_id == user_id,
-            Task.due_date < today,
-            Task.completed == False
-        ).all()
-        
-        print(f"📅 Sending daily digest to {user.email}")
-        
-        # Create digest email
-        subject = f"Daily Task Digest - {today.strftime('%B %d, %Y')}"
-        
-        message = f"""
+def collect_digests(db, user_ids, today):
+    """Load users and their due-today/overdue tasks with two queries in total.
+
+    Used by the on-demand send_daily_digest; the scheduled run pages users
+    with digest_rows_page instead.
+    """
+    tomorrow = today + timedelta(days=1)
+    users = db.query(User).filter(User.id.in_(user_ids)).all()
+    open_tasks = db.query(Task).filter(
+        Task.user_id.in_(user_ids),
+        Task.due_date < tomorrow,
+        Task.completed == False
+    ).all()
+
+    due_today = {user.id: [] for user in users}
+    overdue = {user.id: [] for user in users}
+    for task in open_tasks:
+        if task.user_id not in due_today:
+            continue
+        bucket = overdue if task.due_date < datetime.combine(today, datetime.min.time()) else due_today
+        bucket[task.user_id].append(task)
+
+    return [(user, due_today[user.id], overdue[user.id]) for user in users]
+
+def render_digest(user, due_today, overdue, today):
+    """Build the daily digest email subject and body for one user"""
+    subject = f"Daily Task Digest - {today.strftime('%B %d, %Y')}"
+    
+    message = f"""
         Good morning {user.username}!
         
         Here's your daily task summary:
@@ -137,7 +217,22 @@ def send_daily_digest(user_id):
         Have a productive day!
         Your TodoApp Team
         """
+    return subject, message
+
+@app.task(name='tasks.notification.send_daily_digest')
+def send_daily_digest(user_id):
+    """Send daily digest of tasks to user"""
+    db = SessionLocal()
+    try:
+        today = datetime.utcnow().date()
+        digests = collect_digests(db, [user_id], today)
+        if not digests:
+            return {"status": "error", "message": "User not found"}
+        
+        user, due_today, overdue = digests[0]
+        print(f"📅 Sending daily digest to {user.email}")
         
+        subject, message = render_digest(user, due_today, overdue, today)
         send_email(user.email, subject, message)
         
         return {
@@ -149,116 +244,378 @@ def send_daily_digest(user_id):
     finally:
         db.close()
 
+@app.task(name='tasks.notification.deliver_digest_chunk')
+def deliver_digest_chunk(messages):
+    """Deliver a chunk of rendered digests produced by run_daily_digest"""
+    results = deliver([tuple(message) for message in messages])
+    deferred = [message for message, result in zip(messages, results) if isinstance(result, Deferred)]
+    failed = sum(1 for result in results if result is not None and not isinstance(result, Deferred))
+    sent = len(messages) - failed - len(deferred)
+    if deferred:
+        deliver_digest_chunk.apply_async((deferred,), countdown=earliest_retry(results))
+    print(f"📅 Digest chunk delivered: {sent} sent, {failed} failed, {len(deferred)} deferred")
+    return {"status": "success", "sent": sent, "failed": failed, "deferred": len(deferred)}
+
+def _claim_digest_lease(db, today, owner):
+    """Take today's digest lease unless a live run holds it; False if the run is finished or held"""
+    if db.get(DigestCheckpoint, today) is None:
+        try:
+            db.add(DigestCheckpoint(run_date=today, last_user_id=0, users_processed=0))
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # Another run created it first; compete for the lease below
+
+    now = datetime.utcnow()
+    claimed = db.query(DigestCheckpoint).filter(
+        DigestCheckpoint.run_date == today,
+        DigestCheckpoint.finished_at.is_(None),
+        or_(DigestCheckpoint.lease_owner.is_(None), DigestCheckpoint.lease_until < now)
+    ).update({
+        "lease_owner": owner,
+        "lease_until": now + timedelta(seconds=DIGEST_LEASE_SECONDS)
+    }, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+@app.task(name='tasks.notification.run_daily_digest')
+def run_daily_digest():
+    """Send every user's daily digest in keyset-paged chunks (runs via Celery Beat)
+
+    Each page of DIGEST_CHUNK_SIZE users is read with one grouped query,
+    rendered, and handed to deliver_digest_chunk. Only the holder of
+    today's checkpoint lease pages users, so an overlapping beat tick skips
+    instead of sending the same digests again. Each chunk advances the
+    checkpoint and renews the lease in one guarded UPDATE, committed after
+    the chunk is queued. A crashed run stops renewing; once its lease
+    expires (DIGEST_LEASE_SECONDS) the next tick resumes after the last
+    committed user. A finished run is not repeated.
+    """
+    today = datetime.utcnow().date()
+    start_of_today = datetime.combine(today, datetime.min.time())
+    start_of_tomorrow = start_of_today + timedelta(days=1)
+    owner = uuid.uuid4().hex
+
+    db = SessionLocal()
+    try:
+        if not _claim_digest_lease(db, today, owner):
+            return {"status": "skipped", "message": "Daily digest finished or running elsewhere",
+                    "run_date": today.isoformat()}
+
+        checkpoint = db.get(DigestCheckpoint, today)
+        resumed_from = last_user_id = checkpoint.last_user_id
+        users_processed = checkpoint.users_processed
+        db.commit()
+        chunks = 0
+        held = db.query(DigestCheckpoint).filter(
+            DigestCheckpoint.run_date == today, DigestCheckpoint.lease_owner == owner
+        )
+
+        while True:
+            rows = digest_rows_page(db, last_user_id, start_of_tomorrow, DIGEST_CHUNK_SIZE)
+            if not rows:
+                break
+
+            chunk = []
+            for user_id, user_rows in groupby(rows, key=lambda row: row.id):
+                user_rows = list(user_rows)
+                open_tasks = [row for row in user_rows if row.title is not None]
+                due_today = [row for row in open_tasks if row.due_date >= start_of_today]
+                overdue = [row for row in open_tasks if row.due_date < start_of_today]
+                chunk.append((user_rows[0].email, *render_digest(user_rows[0], due_today, overdue, today)))
+
+            # Advance and renew while still holding the lease. The row stays
+            # locked until the commit, so nobody can take over in between.
+            renewed = held.update({
+                "last_user_id": rows[-1].id,
+                "users_processed": users_processed + len(chunk),
+                "lease_until": datetime.utcnow() + timedelta(seconds=DIGEST_LEASE_SECONDS)
+            }, synchronize_session=False)
+            if not renewed:
+                db.rollback()
+                print(f"⚠️ Daily digest lease lost after user {last_user_id}; leaving the rest to its holder")
+                return {"status": "lease_lost", "run_date": today.isoformat(), "chunks": chunks}
+
+            deliver_digest_chunk.delay(chunk)
+            db.commit()
+            chunks += 1
+            last_user_id = rows[-1].id
+            users_processed += len(chunk)
+
+        held.update({"finished_at": datetime.utcnow(), "lease_owner": None, "lease_until": None},
+                    synchronize_session=False)
+        db.commit()
+
+        print(f"📅 Daily digest run complete: {users_processed} users in {chunks} chunks")
+
+        return {
+            "status": "success",
+            "run_date": today.isoformat(),
+            "resumed_from_user": resumed_from,
+            "users_processed": users_processed,
+            "chunks": chunks
+        }
+    finally:
+        db.close()
+
+def _process_bulk_chunk(db, items, results, offset):
+    """Prefetch users, deliver, and bulk-insert rows for one sub-chunk"""
+    user_ids = set()
+    for data in items:
+        try:
+            user_ids.add(int(data["user_id"]))
+        except (KeyError, TypeError, ValueError):
+            pass
+    emails = dict(db.query(User.id, User.email).filter(User.id.in_(user_ids)).all()) if user_ids else {}
+    
+    outgoing = []
+    for i, data in enumerate(items):
+        try:
+            row = {
+                "user_id": int(data["user_id"]),
+                "task_id": data.get("task_id"),
+                "notify_type": data.get("type", "bulk"),
+                "title": data["title"],
+                "message": data["message"]
+            }
+        except (KeyError, TypeError, ValueError) as e:
+            results[offset + i] = {"status": "failed", "error": f"Invalid item: {e}"}
+            continue
+        email = emails.get(row["user_id"])
+        if email is None:
+            results[offset + i] = {"status": "failed", "error": "User not found"}
+            continue
+        outgoing.append((offset + i, email, row))
+    
+    # One delivery session for the whole sub-chunk
+    errors = deliver([(email, row["title"], row["message"]) for _, email, row in outgoing])
+    
+    sent_at = datetime.utcnow()
+    stored = []
+    for (index, _, row), error in zip(outgoing, errors):
+        if isinstance(error, Deferred):
+            results[index] = {"status": "deferred", "retry_after": error.retry_after}
+            continue
+        if error is not None:
+            results[index] = {"status": "failed", "error": error}
+            continue
+        results[index] = {"status": "sent"}
+        stored.append(dict(row, sent_at=sent_at, status="sent", read=False))
+    
+    if not stored:
+        return
+    
+    # A single multi-row INSERT ... RETURNING instead of one add() per row
+    ids = db.execute(
+        insert(Notification).returning(Notification.id, sort_by_parameter_order=True),
+        stored
+    ).scalars().all()
+    add_unread(db, [row["user_id"] for row in stored])
+    db.commit()
+    
+    publish_notifications(stream_payloads([
+        SimpleNamespace(id=notification_id, **row) for notification_id, row in zip(ids, stored)
+    ]))
+
 @app.task(name='tasks.notification.process_bulk_notifications')
 def process_bulk_notifications(notification_batch):
-    """Process a batch of notifications efficiently"""
+    """Process a batch of notifications efficiently
+
+    Large batches are split into sub-chunks of BULK_NOTIFICATION_CHUNK_SIZE,
+    each handled with one user query, one delivery run and one insert.
+    ``results`` holds the status of every item, in batch order.
+    """
+    results = [None] * len(notification_batch)
     db = SessionLocal()
     try:
-        processed = 0
-        failed = 0
-        
-        for notification_data in notification_batch:
-            try:
-                user_id = notification_data["user_id"]
-                title = notification_data["title"]
-                message = notification_data["message"]
-                notify_type = notification_data.get("type", "bulk")
-                
-                user = db.query(User).get(user_id)
-                if not user:
-                    failed += 1
-                    continue
-                
-                # Send notification
-                send_email(user.email, title, message)
-                
-                # Store in database
-                notification = Notification(
-                    user_id=user_id,
-                    task_id=notification_data.get("task_id"),
-                    notify_type=notify_type,
-                    title=title,
-                    message=message,
-                    sent_at=datetime.utcnow()
-                )
-                db.add(notification)
-                processed += 1
-                
-            except Exception as e:
-                print(f"❌ Failed to process notification: {e}")
-                failed += 1
-        
+        for start in range(0, len(notification_batch), BULK_NOTIFICATION_CHUNK_SIZE):
+            _process_bulk_chunk(
+                db, notification_batch[start:start + BULK_NOTIFICATION_CHUNK_SIZE], results, start
+            )
+    finally:
+        db.close()
+    
+    processed = sum(1 for result in results if result["status"] == "sent")
+    deferred = [i for i, result in enumerate(results) if result["status"] == "deferred"]
+    failed = len(results) - processed - len(deferred)
+    
+    if deferred:
+        # Held back by the outbound rate limit, not failed: send them again later
+        process_bulk_notifications.apply_async(
+            ([notification_batch[i] for i in deferred],),
+            countdown=min(results[i]["retry_after"] for i in deferred)
+        )
+    
+    print(f"📬 Bulk notification processing complete: {processed} sent, {failed} failed, {len(deferred)} deferred")
+    
+    return {
+        "status": "success",
+        "processed": processed,
+        "failed": failed,
+        "deferred": len(deferred),
+        "total": len(notification_batch),
+        "results": results
+    }
+
+@app.task(name='tasks.notification.deliver_pending_notifications')
+def deliver_pending_notifications(notification_ids):
+    """Delivery stage: email a chunk of pending notifications recorded by a scan"""
+    db = SessionLocal()
+    try:
+        # Claim first: rows another delivery already holds are not sent twice
+        claimed = claim_for_delivery(db, notification_ids)
+        user_ids = {row.user_id for row in claimed}
+        emails = dict(db.query(User.id, User.email).filter(User.id.in_(user_ids)).all()) if user_ids else {}
+        # Commit the claim and release the connection while we wait on the mail server
         db.commit()
-        
-        print(f"📬 Bulk notification processing complete: {processed} sent, {failed} failed")
-        
+
+        rows = [row for row in claimed if row.user_id in emails]
+        failed = [row.id for row in claimed if row.user_id not in emails]  # User deleted since the scan
+
+        # Deliver the chunk concurrently; results are written back in bulk below
+        results = deliver([(emails[row.user_id], row.title, row.message) for row in rows])
+
+        delivered, deferred = [], []
+        for row, error in zip(rows, results):
+            if error is None:
+                delivered.append(row.id)
+            elif isinstance(error, Deferred):
+                # Rate limited: the row goes back to pending and is retried below
+                deferred.append(row.id)
+            else:
+                print(f"❌ Failed to deliver notification {row.id}: {error}")
+                failed.append(row.id)
+
+        if delivered:
+            db.query(Notification).filter(Notification.id.in_(delivered)).update(
+                # sent_at stays the creation time: it orders history pages and partitions the table
+                {"status": "sent", "delivered_at": datetime.utcnow()}, synchronize_session=False
+            )
+        mark_failed(db, failed)
+        if deferred:
+            db.query(Notification).filter(Notification.id.in_(deferred)).update(
+                {"status": "pending", "queued_at": datetime.utcnow()}, synchronize_session=False
+            )
+        db.commit()
+
+        if deferred:
+            deliver_pending_notifications.apply_async((deferred,), countdown=earliest_retry(results))
+
+        print(f"📬 Delivery chunk complete: {len(delivered)} sent, {len(failed)} failed, {len(deferred)} deferred")
+
         return {
             "status": "success",
-            "processed": processed,
-            "failed": failed,
-            "total": len(notification_batch)
+            "delivered": len(delivered),
+            "failed": len(failed),
+            "deferred": len(deferred)
         }
     finally:
         db.close()
 
-# Keep the original scheduled tasks but rename them for clarity
+def dispatch_delivery(notification_ids):
+    """Fan pending notifications out to delivery workers as a group of chunks.
+
+    At most NOTIFICATION_DELIVERY_MAX_PARALLEL chunks are created per call, so
+    one large scan cannot flood notification_queue; chunks grow instead.
+    """
+    if not notification_ids:
+        return 0
+
+    chunk_size = max(
+        NOTIFICATION_DELIVERY_CHUNK_SIZE,
+        -(-len(notification_ids) // NOTIFICATION_DELIVERY_MAX_PARALLEL)
+    )
+    chunks = [
+        notification_ids[i:i + chunk_size]
+        for i in range(0, len(notification_ids), chunk_size)
+    ]
+    group(deliver_pending_notifications.s(chunk) for chunk in chunks).apply_async()
+    return len(chunks)
+
+# Scheduled scans only record pending notifications; delivery runs separately
 @app.task(name='tasks.notification.scheduled_due_soon_check')
 def scheduled_due_soon_check():
     """Scheduled task to check for due soon tasks (runs via Celery Beat)"""
     db = SessionLocal()
     try:
-        notifications_sent = 0
-        for task in get_due_soon(db):
-            # Skip if already sent
-            if db.query(Notification).filter_by(task_id=task.id, notify_type="due_soon").first():
-                continue
-            
-            user = db.query(User).get(task.user_id)
-            if not user:
-                continue
-            
-            send_email(
-                user.email,
-                f"Reminder: '{task.title}' due soon",
-                f"Your task '{task.title}' is due at {task.due_date.isoformat()} UTC."
-            )
-            
-            db.add(Notification(task_id=task.id, user_id=user.id, notify_type="due_soon"))
-            notifications_sent += 1
-        
+        pending = record_pending(db, get_due_soon(db), "due_soon", lambda task: (
+            f"Reminder: '{task.title}' due soon",
+            f"Your task '{task.title}' is due at {task.due_date.isoformat()} UTC."
+        ))
+        pending_ids = [n.id for n in pending]
+        payloads = stream_payloads(pending)
         db.commit()
-        print(f"⏰ Scheduled check complete: {notifications_sent} due-soon notifications sent")
-        
-        return {"status": "success", "notifications_sent": notifications_sent}
     finally:
         db.close()
 
+    publish_notifications(payloads)
+    chunks = dispatch_delivery(pending_ids)
+    print(f"⏰ Scheduled check complete: {len(pending_ids)} due-soon notifications queued in {chunks} chunks")
+
+    return {"status": "success", "notifications_queued": len(pending_ids), "chunks": chunks}
+
 @app.task(name='tasks.notification.scheduled_overdue_check')
 def scheduled_overdue_check():
     """Scheduled task to check for overdue tasks (runs via Celery Beat)"""
     db = SessionLocal()
     try:
-        notifications_sent = 0
-        for task in get_overdue(db):
-            if db.query(Notification).filter_by(task_id=task.id, notify_type="overdue").first():
-                continue
-            
-            user = db.query(User).get(task.user_id)
-            if not user:
-                continue
-            
-            send_email(
-                user.email,
-                f"Overdue: '{task.title}'",
-                f"Your task '{task.title}' was due at {task.due_date.isoformat()} UTC and is now overdue."
-            )
-            
-            db.add(Notification(task_id=task.id, user_id=user.id, notify_type="overdue"))
-            notifications_sent += 1
-        
+        pending = record_pending(db, get_overdue(db), "overdue", lambda task: (
+            f"Overdue: '{task.title}'",
+            f"Your task '{task.title}' was due at {task.due_date.isoformat()} UTC and is now overdue."
+        ))
+        pending_ids = [n.id for n in pending]
+        payloads = stream_payloads(pending)
+        db.commit()
+    finally:
+        db.close()
+
+    publish_notifications(payloads)
+    chunks = dispatch_delivery(pending_ids)
+    print(f"⚠️ Scheduled check complete: {len(pending_ids)} overdue notifications queued in {chunks} chunks")
+
+    return {"status": "success", "notifications_queued": len(pending_ids), "chunks": chunks}
+
+@app.task(name='tasks.notification.redeliver_notifications')
+def redeliver_notifications():
+    """Sweep (runs via Celery Beat): re-queue lost pending deliveries and retry failed ones
+
+    Rows are committed as pending before their delivery group is sent, so
+    a crash in between, or a lost message, would leave them pending for good.
+    A worker dying mid-send leaves them 'sending'. Deliveries claim their
+    rows, so re-queueing one that was only slow cannot send it twice.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        lost_before = now - timedelta(seconds=NOTIFICATION_REDISPATCH_AFTER_SECONDS)
+        stale = claim_redelivery(db, "pending", lost_before, NOTIFICATION_REDELIVERY_BATCH)
+        stale += claim_redelivery(db, "sending", lost_before, NOTIFICATION_REDELIVERY_BATCH)
+        retried = claim_redelivery(
+            db, "failed", now - timedelta(seconds=NOTIFICATION_RETRY_AFTER_SECONDS),
+            NOTIFICATION_REDELIVERY_BATCH
+        )
         db.commit()
-        print(f"⚠️ Scheduled check complete: {notifications_sent} overdue notifications sent")
-        
-        return {"status": "success", "notifications_sent": notifications_sent}
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+    chunks = dispatch_delivery(stale + retried)
+    if chunks:
+        print(f"🔁 Redelivery: {len(stale)} lost and {len(retried)} failed notifications queued in {chunks} chunks")
+
+    return {"status": "success", "stale": len(stale), "retried": len(retried), "chunks": chunks}
+
+@app.task(name='tasks.notification.enforce_notification_retention')
+def enforce_notification_retention():
+    """Nightly retention: keep partitions ahead, archive expired rows, drop empty months"""
+    months = ensure_monthly_partitions(engine)
+    result = archive_expired(SessionLocal)
+    dropped = drop_expired_partitions(engine, result["cutoff"])
+
+    print(f"🗄️ Retention complete: {result['archived']} notifications archived, {len(dropped)} partitions dropped")
+
+    return {
+        "status": "success",
+        "archived": result["archived"],
+        "batches": result["batches"],
+        "partitions_ensured": months,
+        "partitions_dropped": dropped
+    }
@@ -0,0 +1,60 @@
+"""
+Outbound email smoothing: global and per-recipient-domain token buckets.
+
+Every send books a slot on both buckets before it goes out and waits for
+it. Batch senders pass a ``max_wait``. A message whose slot is further out
+than that is not sent: it comes back as a Deferred result, and its task
+re-enqueues it with a countdown instead of counting it as failed.
+"""
+from utils.config import (
+    SMTP_RATE_GLOBAL, SMTP_RATE_GLOBAL_BURST, SMTP_RATE_PER_DOMAIN,
+    SMTP_RATE_PER_DOMAIN_BURST, SMTP_RATE_DOMAIN_OVERRIDES
+)
+from utils.ratelimit import Limit, get_limiter
+
+class Deferred(str):
+    """Delivery result for a message held back by rate limiting (not a failure)"""
+
+    def __new__(cls, retry_after):
+        result = super().__new__(cls, f"Deferred by rate limit, retry in {retry_after:.1f}s")
+        result.retry_after = retry_after
+        return result
+
+def _domain_overrides():
+    overrides = {}
+    for entry in filter(None, SMTP_RATE_DOMAIN_OVERRIDES.split(",")):
+        domain, rate = entry.split("=")
+        overrides[domain.strip().lower()] = float(rate)
+    return overrides
+
+DOMAIN_OVERRIDES = _domain_overrides()
+
+def limits_for(to_addr):
+    """Buckets a message to ``to_addr`` must pass; empty when throttling is off"""
+    limits = {}
+    if SMTP_RATE_GLOBAL > 0:
+        limits["smtp:global"] = Limit(SMTP_RATE_GLOBAL, SMTP_RATE_GLOBAL_BURST)
+    domain = to_addr.rsplit("@", 1)[-1].lower()
+    rate = DOMAIN_OVERRIDES.get(domain, SMTP_RATE_PER_DOMAIN)
+    if rate > 0:
+        limits[f"smtp:domain:{domain}"] = Limit(rate, SMTP_RATE_PER_DOMAIN_BURST)
+    return limits
+
+def reserve(to_addr, max_wait=None):
+    """Seconds to wait before sending to ``to_addr``, or a Deferred result.
+
+    ``max_wait=None`` always books a slot, however far out. Interactive
+    single sends use it. Batch senders cap the wait, which keeps the
+    booked horizon short, so a single send never waits long behind a bulk run.
+    """
+    limits = limits_for(to_addr)
+    if not limits:
+        return 0.0
+    wait = get_limiter().reserve(limits, float("inf") if max_wait is None else max_wait)
+    if max_wait is not None and wait > max_wait:
+        return Deferred(wait)
+    return wait
+
+def earliest_retry(results):
+    """Countdown for re-enqueueing the Deferred entries of a results list"""
+    return min(result.retry_after for result in results if isinstance(result, Deferred))
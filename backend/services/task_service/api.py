@@ -1,14 +1,16 @@
 # services/task_service/api.py
 
+import math
 from datetime import datetime, timedelta
 from flask import Flask, request, jsonify
 from flask_jwt_extended import (
     JWTManager, jwt_required, get_jwt_identity
 )
 from sqlalchemy.exc import IntegrityError
-from utils.config import JWT_SECRET      # from utils/config.py
-from utils.db     import SessionLocal, engine, Base
+from utils.config import JWT_SECRET, JOB_WAIT_MAX      # from utils/config.py
+from utils.db     import SessionLocal
 from .models      import Task
+from .onboarding  import ensure_onboarding
 from services.user_service.models import User
 from flask_cors import CORS
 
@@ -17,18 +19,24 @@ from .tasks import (
     schedule_reminder, notify_team_members, update_project_progress,
     generate_task_analytics, backup_task_data
 )
-from services.notification_service.tasks import (
-    send_instant_notification, send_task_completion_notification
-)
 from services.user_service.tasks import update_user_stats, sync_to_external_service
-
-# ensure tables exist
-Base.metadata.create_all(bind=engine)
+from utils.debounce import debounce_metrics
+from utils.claimcheck import claim_check_metrics
+from utils.jobs import Job, wait_for_job
+from utils.entity_cache import task_snapshot, entity_cache_metrics
+from utils.revocation import register_revocation_check
+from utils.http_ratelimit import install_rate_limiting
 
 app = Flask(__name__)
 app.config["JWT_SECRET_KEY"] = JWT_SECRET
 jwt = JWTManager(app)
+register_revocation_check(jwt)
 CORS(app, origins=["http://localhost:5173"], supports_credentials=True)
+install_rate_limiting(app, "task_service")
+
+@app.route("/health")
+def health():
+    return jsonify({"status": "ok"}), 200
 
 
 @app.route("/tasks", methods=["POST"])
@@ -46,6 +54,7 @@ def create_task():
 
     user_id = get_jwt_identity()
     db = SessionLocal()
+    ensure_onboarding(db, user_id)
     task = Task(
         user_id=user_id,
         title=data["title"],
@@ -58,25 +67,27 @@ def create_task():
     
     # 🚀 REAL BROKER INTEGRATION: Trigger async tasks after task creation
     print(f"🎯 Task {task.id} created - triggering async tasks via broker")
+    job = Job("task_created", user_id)
+    snapshot = task_snapshot(task)  # Workers read the task from the message, not the database
     
     # Schedule reminder if task is due soon
     if due <= datetime.utcnow() + timedelta(days=2):
         reminder_time = due - timedelta(hours=2)  # Remind 2 hours before
-        schedule_reminder.delay(task.id, reminder_time.isoformat())
+        job.dispatch(schedule_reminder, task.id, reminder_time.isoformat(), snapshot=snapshot)
     
     # Check if this is a high-priority task (you could add priority field)
     priority = data.get("priority", "normal")
     if priority == "high":
-        notify_team_members.delay(task.id)
+        job.dispatch(notify_team_members, task.id, snapshot=snapshot)
     
     # Backup task data to external storage
-    backup_task_data.delay(task.id)
+    job.dispatch(backup_task_data, task.id, snapshot=snapshot)
     
     # Update user statistics
-    update_user_stats.delay(user_id)
+    job.dispatch(update_user_stats, user_id)
     
     # Send analytics event
-    sync_to_external_service.delay(user_id, "task_created", {
+    job.dispatch(sync_to_external_service, user_id, "task_created", {
         "task_id": task.id,
         "title": task.title,
         "due_date": task.due_date.isoformat(),
@@ -84,11 +95,13 @@ def create_task():
     })
     
     # Send instant notification to user
-    send_instant_notification.delay(
+    job.dispatch(
+        "tasks.notification.send_instant_notification",
         user_id,
         "Task Created Successfully! 📝",
         f"Your task '{task.title}' has been created and is due on {due.strftime('%B %d, %Y')}."
     )
+    job.save()
     
     db.close()
 
@@ -99,6 +112,7 @@ def create_task():
             "description": task.description,
             "due_date": task.due_date.isoformat(),
             "completed": task.completed,
+            "job_id": job.id,
             "msg": "Task created! Background processing initiated."
         }),
         201
@@ -110,6 +124,7 @@ def create_task():
 def list_tasks():
     user_id = get_jwt_identity()
     db = SessionLocal()
+    ensure_onboarding(db, user_id)  # First visit: create the onboarding tasks
     tasks = db.query(Task).filter_by(user_id=user_id).all()
     db.close()
     return jsonify([
@@ -178,30 +193,33 @@ def update_task(task_id):
     db.refresh(task)
     
     # 🚀 REAL BROKER INTEGRATION: Trigger async tasks after task update
+    job = Job("task_completed" if task_completion_triggered else "task_updated", user_id)
+    snapshot = task_snapshot(task)
     if task_completion_triggered:
         print(f"🎯 Task {task.id} completed - triggering async tasks via broker")
         
         # Send task completion notification
-        send_task_completion_notification.delay(task.id)
+        job.dispatch("tasks.notification.send_task_completion_notification", task.id, snapshot=snapshot)
         
         # Update project progress
-        update_project_progress.delay(task.id)
+        job.dispatch(update_project_progress, task.id, user_id=user_id)
         
         # Update user statistics
-        update_user_stats.delay(user_id)
+        job.dispatch(update_user_stats, user_id)
         
         # Generate analytics for task completion patterns
-        generate_task_analytics.delay(user_id)
+        job.dispatch(generate_task_analytics, user_id)
         
         # Sync completion event to external services
-        sync_to_external_service.delay(user_id, "task_completed", {
+        job.dispatch(sync_to_external_service, user_id, "task_completed", {
             "task_id": task.id,
             "title": task.title,
             "completion_time": datetime.utcnow().isoformat()
         })
     
     # Always backup updated task data
-    backup_task_data.delay(task.id)
+    job.dispatch(backup_task_data, task.id, snapshot=snapshot)
+    job.save()
     
     db.close()
     
@@ -210,7 +228,8 @@ def update_task(task_id):
         "title": task.title,
         "description": task.description,
         "due_date": task.due_date.isoformat(),
-        "completed": task.completed
+        "completed": task.completed,
+        "job_id": job.id
     }
     
     if task_completion_triggered:
@@ -234,6 +253,46 @@ def delete_task(task_id):
     db.close()
     return jsonify({"msg": "Deleted"}), 200
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+@jwt_required()
+def get_job(job_id):
+    """Status of the background work started by a request.
+
+    ``?wait=N`` long-polls: the response is held for up to N seconds
+    (capped at JOB_WAIT_MAX) and returned as soon as the job finishes.
+    """
+    try:
+        wait = float(request.args.get("wait", 0))
+    except ValueError:
+        return jsonify({"msg": "Invalid wait"}), 400
+    if not math.isfinite(wait):  # NaN would slip through the clamp below
+        return jsonify({"msg": "Invalid wait"}), 400
+    wait = min(max(wait, 0), JOB_WAIT_MAX)
+
+    status = wait_for_job(job_id, wait)
+    # Jobs without an owner come from admin triggers; those are read at /admin/jobs/<id>
+    if status is None or status["user_id"] != get_jwt_identity():
+        return jsonify({"msg": "Job not found"}), 404
+    return jsonify(status), 200
+
+
+@app.route("/admin/debounce-metrics", methods=["GET"])
+def debounce_metrics_view():
+    """How many recompute calls were collapsed into an already pending run"""
+    return jsonify(debounce_metrics()), 200
+
+
+@app.route("/admin/claim-check-metrics", methods=["GET"])
+def claim_check_metrics_view():
+    """Task bodies moved off the broker and the bytes that saved"""
+    return jsonify(claim_check_metrics()), 200
+
+
+@app.route("/admin/entity-cache-metrics", methods=["GET"])
+def entity_cache_metrics_view():
+    """Per worker task: user/task lookups served without a query, and the queries that still ran"""
+    return jsonify(entity_cache_metrics()), 200
+
 
 if __name__ == "__main__":
     # pick a port that doesn’t collide with user-service
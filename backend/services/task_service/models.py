@@ -1,13 +1,13 @@
 # backend/services/user_service/models.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from utils.db import Base
 
 class Task(Base):
     __tablename__ = "tasks"
     id          = Column(Integer, primary_key=True, index=True)
-    user_id     = Column(Integer,ForeignKey("users.id", ondelete="CASCADE"),nullable=False,index=True)
+    user_id     = Column(Integer,ForeignKey("users.id", ondelete="CASCADE"),nullable=False)  # Indexed with completed below
     title       = Column(String, nullable=False)
     description = Column(String, nullable=True)
     due_date    = Column(DateTime, nullable=False)
@@ -23,4 +23,14 @@ class Task(Base):
         "User",
         back_populates="tasks",
         lazy="joined"
-    )
\ No newline at end of file
+    )
+
+# Hot-path indexes; existing databases get them from utils/migrations.py.
+# Per-user listing and the completed/total counts:
+Index("ix_tasks_user_id_completed", Task.user_id, Task.completed)
+# Due-soon and overdue scans only ever look at open tasks:
+Index("ix_tasks_open_due_date", Task.due_date,
+      postgresql_where=Task.completed == False, sqlite_where=Task.completed == False)
+# The digest's per-user join on open tasks due before a cutoff:
+Index("ix_tasks_open_user_id_due_date", Task.user_id, Task.due_date,
+      postgresql_where=Task.completed == False, sqlite_where=Task.completed == False)
@@ -0,0 +1,70 @@
+"""
+Onboarding tasks for new users, created from templates
+
+With ONBOARDING_TASKS=lazy (the default) registration only flags the user
+as ``onboarding_pending``. The tasks are created the first time the user
+lists or creates tasks, so users who never come back cost no rows. With
+``eager`` they are inserted together with the user row, in one multi-row
+INSERT in the same transaction. Either way there is no Celery hop.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from utils.lru import LRUCache
+from .models import Task
+
+ONBOARDING_TEMPLATES = [
+    {
+        "title": "Welcome to TodoApp! 👋",
+        "description": "Complete this task to get started",
+        "due_in_days": 1
+    },
+    {
+        "title": "Explore the features",
+        "description": "Try creating, editing, and completing tasks",
+        "due_in_days": 3
+    },
+    {
+        "title": "Set up your profile",
+        "description": "Add your preferences and settings",
+        "due_in_days": 7
+    }
+]
+
+# Users this process has already seen settled, so their later requests skip the check
+_settled = LRUCache(maxsize=100000, ttl=24 * 60 * 60)
+
+def onboarding_rows(user_id, now=None):
+    now = now or datetime.utcnow()
+    return [{
+        "user_id": user_id,
+        "title": template["title"],
+        "description": template["description"],
+        "due_date": now + timedelta(days=template["due_in_days"]),
+        "completed": False,
+        "created_at": now,
+        "updated_at": now
+    } for template in ONBOARDING_TEMPLATES]
+
+def insert_onboarding_tasks(session, user_id):
+    """Add the template tasks for ``user_id`` with one INSERT; the caller commits"""
+    session.execute(insert(Task).values(onboarding_rows(user_id)))
+    return len(ONBOARDING_TEMPLATES)
+
+def ensure_onboarding(session, user_id):
+    """Create a lazily deferred user's onboarding tasks, once; returns how many were created.
+
+    Claiming the flag with a conditional UPDATE makes concurrent first
+    requests safe: only one of them sees a row to update and inserts.
+    """
+    from services.user_service.models import User
+
+    user_id = int(user_id)
+    if _settled.get(user_id):
+        return 0
+    claimed = session.query(User).filter(
+        User.id == user_id, User.onboarding_pending == True
+    ).update({"onboarding_pending": False}, synchronize_session=False)
+    created = insert_onboarding_tasks(session, user_id) if claimed else 0
+    session.commit()
+    _settled.set(user_id, True)
+    return created
@@ -2,22 +2,23 @@
 Task service async tasks - Real broker integration examples
 """
 from utils.broker import app
+from utils.debounce import DebouncedTask
 from utils.db import SessionLocal
+from utils.entity_cache import cached_user, load_task
 from .models import Task
 from services.user_service.models import User
 from datetime import datetime, timedelta
-import requests
 
 @app.task(name='tasks.task.schedule_reminder')
-def schedule_reminder(task_id, reminder_time):
+def schedule_reminder(task_id, reminder_time, snapshot=None):
     """Schedule a reminder for a specific task"""
     db = SessionLocal()
     try:
-        task = db.query(Task).get(task_id)
+        task = load_task(db, task_id, snapshot)
         if not task:
             return {"status": "error", "message": "Task not found"}
         
-        user = db.query(User).get(task.user_id)
+        user = cached_user(db, task.user_id)
         if not user:
             return {"status": "error", "message": "User not found"}
         
@@ -36,15 +37,15 @@ def schedule_reminder(task_id, reminder_time):
         db.close()
 
 @app.task(name='tasks.task.notify_team_members')
-def notify_team_members(task_id):
+def notify_team_members(task_id, snapshot=None):
     """Notify team members about high-priority tasks"""
     db = SessionLocal()
     try:
-        task = db.query(Task).get(task_id)
+        task = load_task(db, task_id, snapshot)
         if not task:
             return {"status": "error", "message": "Task not found"}
         
-        user = db.query(User).get(task.user_id)
+        user = cached_user(db, task.user_id)
         if not user:
             return {"status": "error", "message": "User not found"}
         
@@ -70,19 +71,24 @@ def notify_team_members(task_id):
     finally:
         db.close()
 
-@app.task(name='tasks.task.update_project_progress')
-def update_project_progress(task_id):
-    """Update project progress when a task is completed"""
+@app.task(name='tasks.task.update_project_progress', base=DebouncedTask, debounce_args=("user_id",))
+def update_project_progress(task_id, user_id=None):
+    """Update project progress when a task is completed
+
+    Progress covers all of the user's tasks, so calls that pass ``user_id``
+    are debounced per user rather than per completed task.
+    """
     db = SessionLocal()
     try:
-        task = db.query(Task).get(task_id)
-        if not task:
-            return {"status": "error", "message": "Task not found"}
+        if user_id is None:
+            task = db.query(Task).get(task_id)
+            if not task:
+                return {"status": "error", "message": "Task not found"}
+            user_id = task.user_id
         
         # In real app, you'd have a projects table and calculate progress
         # For demo, we'll simulate project progress calculation
         
-        user_id = task.user_id
         total_tasks = db.query(Task).filter_by(user_id=user_id).count()
         completed_tasks = db.query(Task).filter_by(user_id=user_id, completed=True).count()
         
@@ -98,6 +104,7 @@ def update_project_progress(task_id):
         return {
             "status": "success",
             "task_id": task_id,
+            "user_id": user_id,
             "progress_percentage": progress_percentage,
             "completed_tasks": completed_tasks,
             "total_tasks": total_tasks
@@ -105,12 +112,12 @@ def update_project_progress(task_id):
     finally:
         db.close()
 
-@app.task(name='tasks.task.generate_task_analytics')
+@app.task(name='tasks.task.generate_task_analytics', base=DebouncedTask)
 def generate_task_analytics(user_id):
     """Generate analytics data for task completion patterns"""
     db = SessionLocal()
     try:
-        user = db.query(User).get(user_id)
+        user = cached_user(db, user_id)
         if not user:
             return {"status": "error", "message": "User not found"}
         
@@ -143,11 +150,11 @@ def generate_task_analytics(user_id):
         db.close()
 
 @app.task(name='tasks.task.backup_task_data')
-def backup_task_data(task_id):
+def backup_task_data(task_id, snapshot=None):
     """Backup task data to external storage"""
     db = SessionLocal()
     try:
-        task = db.query(Task).get(task_id)
+        task = load_task(db, task_id, snapshot)
         if not task:
             return {"status": "error", "message": "Task not found"}
         
@@ -5,30 +5,38 @@ from flask_jwt_extended import (
     jwt_required, get_jwt, get_jwt_identity
 )
 from sqlalchemy.exc import IntegrityError
-from utils.config import JWT_SECRET, JWT_ACCESS_EXPIRES
-from utils.db import SessionLocal, engine, Base
+from utils.config import (
+    JWT_SECRET, JWT_ACCESS_EXPIRES, PROFILE_CLAIMS_IN_TOKEN, ONBOARDING_TASKS,
+    RATE_LIMIT_AUTH_RATE, RATE_LIMIT_AUTH_BURST
+)
+from utils.db import SessionLocal
 from .models import User
 from services.task_service.models import Task
-from werkzeug.security import generate_password_hash, check_password_hash
+from services.task_service.onboarding import insert_onboarding_tasks
+from .passwords import hash_password, verify_password, needs_rehash, PasswordHashingBusy
+from .profile_cache import get_profile, serialize, profile_cache_metrics
 from flask_cors import CORS
 
 # Import async tasks for real broker integration
-from .tasks import send_welcome_email, create_default_tasks, sync_to_external_service
-
-BLACKLIST = set()
-
-# create tables if they don’t exist
-Base.metadata.create_all(bind=engine)
+from .tasks import send_welcome_email, sync_to_external_service
+from utils.jobs import Job
+from utils.revocation import register_revocation_check, revoke_token
+from utils.http_ratelimit import install_rate_limiting, rate_limit
 
 app = Flask(__name__)
 app.config["JWT_SECRET_KEY"] = JWT_SECRET
 app.config["JWT_ACCESS_TOKEN_EXPIRES"]  = JWT_ACCESS_EXPIRES
-app.config["JWT_BLACKLIST_ENABLED"]     = True
-app.config["JWT_BLACKLIST_TOKEN_CHECKS"] = ["access"]
 jwt = JWTManager(app)
+register_revocation_check(jwt)  # Shared with the other services; see utils/revocation.py
 CORS(app, origins=["http://localhost:5173"], supports_credentials=True)
+install_rate_limiting(app, "user_service")
+
+@app.route("/health")
+def health():
+    return jsonify({"status": "ok"}), 200
 
 @app.route("/auth/register", methods=["POST"])
+@rate_limit(RATE_LIMIT_AUTH_RATE, RATE_LIMIT_AUTH_BURST, by="ip")
 def register():
     data = request.get_json() or {}
     for f in ("username","email","password"):
@@ -37,36 +45,40 @@ def register():
 
     db = SessionLocal()
     try:
-        hashed = generate_password_hash(data["password"])
+        hashed = hash_password(data["password"])
         user = User(
           username=data["username"],
           email=data["email"],
-          password_hash=hashed
+          password_hash=hashed,
+          onboarding_pending=ONBOARDING_TASKS == "lazy"
         )
         db.add(user)
+        if ONBOARDING_TASKS == "eager":
+            db.flush()  # assigns user.id
+            insert_onboarding_tasks(db, user.id)
         db.commit()
         db.refresh(user)
         
         # 🚀 REAL BROKER INTEGRATION: Trigger async tasks after user registration
         print(f"🎯 User {user.id} registered - triggering async tasks via broker")
+        job = Job("user_registered", user.id)
         
         # Send welcome email asynchronously
-        send_welcome_email.delay(user.id)
-        
-        # Create default tasks for new user
-        create_default_tasks.delay(user.id)
+        job.dispatch(send_welcome_email, user.id)
         
         # Sync user registration to external services (analytics, CRM, etc.)
-        sync_to_external_service.delay(user.id, "user_registered", {
+        job.dispatch(sync_to_external_service, user.id, "user_registered", {
             "username": user.username,
             "email": user.email,
             "registration_time": user.created_at.isoformat()
         })
+        job.save()
         
         return jsonify({
             "id": user.id,
             "username": user.username,
-            "msg": "Registration successful! Welcome tasks and email are being processed."
+            "job_id": job.id,
+            "msg": "Registration successful! Your welcome email is being processed."
         }), 201
 
     except IntegrityError:
@@ -77,6 +89,7 @@ def register():
         db.close()
 
 @app.route("/auth/login", methods=["POST"])
+@rate_limit(RATE_LIMIT_AUTH_RATE, RATE_LIMIT_AUTH_BURST, by="ip")
 def login():
     data = request.get_json() or {}
     for f in ("username","password"):
@@ -85,13 +98,33 @@ def login():
 
     db = SessionLocal()
     user = db.query(User).filter_by(username=data["username"]).first()
-    db.close()
-    if not user or not check_password_hash(user.password_hash, data["password"]):
+    db.close()  # Don't hold a connection while the password is checked
+    if not user or not verify_password(user.password_hash, data["password"]):
         return jsonify({"msg":"Bad credentials"}), 401
 
-    token = create_access_token(identity=str(user.id))
+    if needs_rehash(user.password_hash):
+        # Upgrade legacy hashes while we have the plaintext; retried next login if busy
+        try:
+            new_hash = hash_password(data["password"])
+        except PasswordHashingBusy:
+            new_hash = None
+        if new_hash:
+            db = SessionLocal()
+            try:
+                db.query(User).filter_by(id=user.id).update({"password_hash": new_hash})
+                db.commit()
+            finally:
+                db.close()
+
+    # Optionally carry the (rarely changing) profile so /users/me needs no lookup
+    claims = {"profile": serialize(user)} if PROFILE_CLAIMS_IN_TOKEN else None
+    token = create_access_token(identity=str(user.id), additional_claims=claims)
     return jsonify({"access_token": token}), 200
 
+@app.errorhandler(PasswordHashingBusy)
+def hashing_busy(e):
+    return jsonify({"msg": "Too many sign-ins right now, please retry"}), 503, {"Retry-After": "1"}
+
 @app.route("/users/me", methods=["GET"])
 @jwt_required()
 def user_profile():
@@ -99,38 +132,27 @@ def user_profile():
     Returns the current user’s profile.
     Protected: must send Authorization: Bearer <token>
     """
-    # 1) get the user id out of the JWT
-    user_id = get_jwt_identity()
-
-    # 2) load the user from the database
-    db = SessionLocal()
-    user = db.query(User).get(user_id)
-    db.close()
-
-    if not user:
+    # 1) tokens issued with PROFILE_CLAIMS_IN_TOKEN already carry the profile
+    profile = get_jwt().get("profile")
+    if profile is not None:
+        return jsonify(profile), 200
+
+    # 2) otherwise look it up by the user id in the JWT, through the profile cache
+    profile = get_profile(get_jwt_identity())
+    if profile is None:
         return jsonify({"msg": "User not found"}), 404
 
-    # 3) return whatever fields you want exposed
-    return jsonify({
-        "id":         user.id,
-        "username":   user.username,
-        "email":      user.email,
-        "created_at": user.created_at.isoformat()
-    }), 200
+    return jsonify(profile), 200
 
-@jwt.token_in_blocklist_loader
-def check_if_token_revoked(jwt_header, jwt_payload) -> bool:
-    """
-    This function is called on every protected request.
-    Return True if the token’s jti is in our blacklist.
-    """
-    return jwt_payload["jti"] in BLACKLIST
+@app.route("/admin/profile-cache-metrics", methods=["GET"])
+def admin_profile_cache_metrics():
+    """Profile cache hits by tier, database misses and invalidations for this process"""
+    return jsonify(profile_cache_metrics()), 200
 
 @app.route("/auth/logout", methods=["POST"])
 @jwt_required()
 def logout():
-    jti = get_jwt()["jti"]            # grab the unique token identifier
-    BLACKLIST.add(jti)                # revoke it
+    revoke_token(get_jwt())           # revoked for every service until the token expires
     return jsonify({"msg": "Successfully logged out"}), 200
 
 
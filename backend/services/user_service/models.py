@@ -1,6 +1,6 @@
 # backend/services/user_service/models.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, false
 from sqlalchemy.orm import relationship
 from utils.db import Base
 
@@ -12,10 +12,15 @@ class User(Base):
     email         = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     created_at    = Column(DateTime, default=datetime.utcnow)
+    # Onboarding tasks not created yet (ONBOARDING_TASKS=lazy); see task_service/onboarding.py
+    onboarding_pending = Column(Boolean, nullable=False, default=False, server_default=false())
 
     tasks = relationship(
         "Task",
         back_populates="owner",
         cascade="all, delete-orphan",
         lazy="dynamic"
-    )
\ No newline at end of file
+    )
+
+# Registers the session hooks that drop cached profiles whenever a User is written
+from . import profile_cache  # noqa: E402,F401
@@ -0,0 +1,64 @@
+"""
+Password hashing off the request threads
+
+Hashes and checks run in a small process pool, so a login spike uses at
+most PASSWORD_HASH_WORKERS cores and other requests on the replica keep
+being served. Up to PASSWORD_HASH_QUEUE more calls may wait for a worker;
+beyond that PasswordHashingBusy is raised and the API answers 503 instead
+of queueing without bound.
+"""
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+from utils.config import (
+    PASSWORD_HASH_METHOD, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE, PASSWORD_HASH_TIMEOUT
+)
+
+class PasswordHashingBusy(Exception):
+    """Every hashing slot is taken; the caller should retry shortly"""
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        return _pool
+
+def _run(fn, *args):
+    if PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+    try:
+        future = _get_pool().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    # A timed-out call is still queued or running, so its slot is only freed when it finishes
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except TimeoutError:
+        raise PasswordHashingBusy() from None
+
+def hash_password(password):
+    return _run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+@functools.lru_cache(maxsize=None)
+def _method_prefix():
+    """werkzeug writes defaults into the prefix ("pbkdf2:sha256" becomes
+    "pbkdf2:sha256:600000"), so compare against a hash it actually made.
+    Full cost, so computed on first use rather than at import."""
+    return generate_password_hash("", PASSWORD_HASH_METHOD).split("$", 1)[0]
+
+def needs_rehash(password_hash):
+    """True if the hash was made with another method or cost than PASSWORD_HASH_METHOD"""
+    return password_hash.split("$", 1)[0] != _method_prefix()
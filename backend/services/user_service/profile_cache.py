@@ -0,0 +1,191 @@
+"""
+Cached read path for user profiles (GET /users/me)
+
+Lookups go through a per-process LRU (PROFILE_CACHE_SIZE entries, each kept
+PROFILE_CACHE_TTL seconds), then a shared Redis tier (PROFILE_CACHE_SHARED_TTL),
+then the database.
+
+Any committed update or delete of a User through the ORM drops that
+user's entries. The Redis key is deleted, and an announcement on the
+pub/sub hub evicts the local copy in every other process. The Celery
+workers' user records are invalidated too (utils/entity_cache.py). Bulk
+``query(User).update()`` bypasses the ORM events, so call
+invalidate_profile() after one if it touches profile fields.
+
+A miss can read the old row just before an invalidation lands and would
+then cache it again. Each invalidation bumps a per-user version in Redis.
+A miss reads the version before its query and fills the shared tier
+only if the version is still the same. The local tier is guarded the
+same way with a per-process invalidation count.
+"""
+import json
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from utils.config import PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL, PROFILE_CACHE_SHARED_TTL
+from utils.entity_cache import forget_user
+from utils.lru import LRUCache
+from utils.pubsub import get_hub
+from utils.redis_client import get_redis
+
+CHANNEL = "users:invalidate"
+VERSION_TTL = 86400  # Far longer than any fill takes
+
+# Fill the shared tier only if no invalidation happened since the version was read
+_FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+_local = LRUCache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)
+_counters = {"local_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+_counters_lock = threading.Lock()
+_listener = None
+_listener_lock = threading.Lock()
+_invalidated = 0            # Local evictions so far; a fill that saw this change is dropped
+_fill_script = None
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+def _shared():
+    return get_redis() if PROFILE_CACHE_SHARED_TTL > 0 else None
+
+def _evict(user_id=None):
+    """Drop one local entry, or all of them"""
+    global _invalidated
+    with _counters_lock:
+        _invalidated += 1
+    if user_id is None:
+        _local.clear()
+    else:
+        _local.pop(user_id)
+
+def _fill_shared(client, user_id, profile, version):
+    global _fill_script
+    if _fill_script is None:
+        _fill_script = client.register_script(_FILL_SCRIPT)
+    _fill_script(
+        keys=[f"users:profile:{user_id}", f"users:profile-version:{user_id}"],
+        args=[version, json.dumps(profile), PROFILE_CACHE_SHARED_TTL]
+    )
+
+def serialize(user):
+    return {
+        "id":         user.id,
+        "username":   user.username,
+        "email":      user.email,
+        "created_at": user.created_at.isoformat()
+    }
+
+def _listen():
+    """Evict local entries that another process invalidated"""
+    with get_hub().subscribe(CHANNEL) as subscription:
+        while True:
+            message = subscription.get(timeout=60)
+            if subscription.overflowed:
+                subscription.overflowed = False
+                _evict()  # Missed some invalidations; start over
+            elif message is not None:
+                _evict(message["user_id"])
+
+def _ensure_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen, name="profile-cache-invalidations", daemon=True)
+            _listener.start()
+
+def get_profile(user_id):
+    """The user's profile dict, or None if there is no such user"""
+    _ensure_listener()
+    user_id = int(user_id)
+    profile = _local.get(user_id)
+    if profile is not None:
+        _count("local_hits")
+        return profile
+
+    client = _shared()
+    if client is not None:
+        raw = client.get(f"users:profile:{user_id}")
+        if raw is not None:
+            profile = json.loads(raw)
+            _local.set(user_id, profile)
+            _count("shared_hits")
+            return profile
+
+    _count("misses")
+    # Read before the query: an invalidation after this point cancels the fill
+    with _counters_lock:
+        invalidated = _invalidated
+    version = None
+    if client is not None:
+        version = client.get(f"users:profile-version:{user_id}") or b""
+        version = version.decode() if isinstance(version, bytes) else version
+
+    from utils.db import SessionLocal
+    from .models import User
+    db = SessionLocal()
+    try:
+        user = db.query(User).get(user_id)
+        profile = serialize(user) if user else None
+    finally:
+        db.close()
+    if profile is None:
+        return None
+
+    with _counters_lock:
+        if _invalidated == invalidated:
+            _local.set(user_id, profile)
+    if client is not None:
+        _fill_shared(client, user_id, profile, version)
+    return profile
+
+def invalidate_profile(user_id):
+    """Forget a user's cached profile in this and every other process"""
+    user_id = int(user_id)
+    _evict(user_id)
+    client = _shared()
+    if client is not None:
+        pipe = client.pipeline(transaction=True)
+        pipe.incr(f"users:profile-version:{user_id}")
+        pipe.expire(f"users:profile-version:{user_id}", VERSION_TTL)
+        pipe.delete(f"users:profile:{user_id}")
+        pipe.execute()
+    get_hub().publish(CHANNEL, {"user_id": user_id})
+    forget_user(user_id)  # Celery workers' user records
+    _count("invalidations")
+
+def profile_cache_metrics():
+    with _counters_lock:
+        metrics = dict(_counters)
+    lookups = metrics["local_hits"] + metrics["shared_hits"] + metrics["misses"]
+    metrics["hit_rate"] = round((lookups - metrics["misses"]) / lookups, 4) if lookups else 0.0
+    return metrics
+
+# Invalidate after commit, not on flush: until the commit, readers still see
+# the old row and would cache it again. Misses already reading when the
+# invalidation lands are kept out of the cache by the checks in get_profile
+@event.listens_for(Session, "after_flush")
+def _track_user_writes(session, flush_context):
+    written = session.info.setdefault("written_user_ids", set())
+    # New users cannot be cached yet (misses are not cached), so only changes count
+    for obj in (*session.dirty, *session.deleted):
+        if getattr(obj, "__tablename__", None) == "users" and obj.id is not None:
+            written.add(obj.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop("written_user_ids", ()):
+        try:
+            invalidate_profile(user_id)
+        except Exception as e:
+            print(f"⚠️ Could not invalidate cached profile for user {user_id}: {e}")
+
+@event.listens_for(Session, "after_rollback")
+def _forget_user_writes(session):
+    session.info.pop("written_user_ids", None)
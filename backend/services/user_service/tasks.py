@@ -2,19 +2,20 @@
 User service async tasks - Real broker integration examples
 """
 from utils.broker import app
+from utils.debounce import DebouncedTask
 from utils.db import SessionLocal
+from utils.entity_cache import cached_user
 from .models import User
 from services.task_service.models import Task
-from datetime import datetime, timedelta
-import requests
-import os
+from services.task_service.onboarding import insert_onboarding_tasks
+from datetime import datetime
 
 @app.task(name='tasks.user.send_welcome_email')
 def send_welcome_email(user_id):
     """Send welcome email when user registers"""
     db = SessionLocal()
     try:
-        user = db.query(User).get(user_id)
+        user = cached_user(db, user_id)
         if not user:
             return {"status": "error", "message": "User not found"}
         
@@ -30,57 +31,28 @@ def send_welcome_email(user_id):
 
 @app.task(name='tasks.user.create_default_tasks')
 def create_default_tasks(user_id):
-    """Create default tasks for new users"""
+    """Create onboarding tasks for a user (registration no longer queues this; kept for queued messages)"""
     db = SessionLocal()
     try:
         user = db.query(User).get(user_id)
         if not user:
             return {"status": "error", "message": "User not found"}
-        
-        # Create helpful default tasks
-        default_tasks = [
-            {
-                "title": "Welcome to TodoApp! 👋",
-                "description": "Complete this task to get started",
-                "due_date": datetime.utcnow() + timedelta(days=1)
-            },
-            {
-                "title": "Explore the features",
-                "description": "Try creating, editing, and completing tasks",
-                "due_date": datetime.utcnow() + timedelta(days=3)
-            },
-            {
-                "title": "Set up your profile",
-                "description": "Add your preferences and settings",
-                "due_date": datetime.utcnow() + timedelta(days=7)
-            }
-        ]
-        
-        created_tasks = []
-        for task_data in default_tasks:
-            task = Task(
-                user_id=user_id,
-                title=task_data["title"],
-                description=task_data["description"],
-                due_date=task_data["due_date"],
-                completed=False
-            )
-            db.add(task)
-            created_tasks.append(task_data["title"])
-        
+
+        created = insert_onboarding_tasks(db, user_id)
+        user.onboarding_pending = False
         db.commit()
-        print(f"✅ Created {len(created_tasks)} default tasks for user {user.username}")
-        
-        return {"status": "success", "tasks_created": len(created_tasks)}
+        print(f"✅ Created {created} default tasks for user {user.username}")
+
+        return {"status": "success", "tasks_created": created}
     finally:
         db.close()
 
-@app.task(name='tasks.user.update_user_stats')
+@app.task(name='tasks.user.update_user_stats', base=DebouncedTask)
 def update_user_stats(user_id):
     """Update user statistics (task completion rate, etc.)"""
     db = SessionLocal()
     try:
-        user = db.query(User).get(user_id)
+        user = cached_user(db, user_id)
         if not user:
             return {"status": "error", "message": "User not found"}
         
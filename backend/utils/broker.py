@@ -1,27 +1,130 @@
 """
 Shared broker utilities for distributed task processing
+
+Tasks run in three latency lanes:
+
+  interactive  a user is waiting on the result (instant notifications, welcome email)
+  standard     ordinary background work, on the owning service's queue
+  bulk         backlogs that may take minutes (digests, backups, analytics)
+
+Each lane has its own queues and a message priority (Redis: 0 is highest).
+Workers pick lanes with WORKER_LANES, see configure_worker_lanes().
 """
+import importlib
 from celery import Celery
+from kombu import Queue
 from .config import BROKER_URL
+from .claimcheck import SERIALIZER as CLAIM_CHECK_SERIALIZER
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_STANDARD    = 3
+PRIORITY_BULK        = 9
+
+# Queues per lane, in the order a worker serving several lanes drains them,
+# and the prefetch multiplier that suits the lane
+LANES = {
+    "interactive": {"queues": ["interactive_queue"], "prefetch": 1},
+    "standard":    {"queues": ["user_queue", "task_queue", "notification_queue"], "prefetch": 4},
+    "bulk":        {"queues": ["bulk_queue", "analytics_queue"], "prefetch": 1},
+}
+
+INTERACTIVE = {'queue': 'interactive_queue', 'priority': PRIORITY_INTERACTIVE}
+BULK        = {'queue': 'bulk_queue', 'priority': PRIORITY_BULK}
+ANALYTICS   = {'queue': 'analytics_queue', 'priority': PRIORITY_BULK}
+
+# Where each service's tasks live. Workers import these by name when they
+# start; producers only need the task names (see send()).
+TASK_MODULES = {
+    'tasks.user.': 'services.user_service.tasks',
+    'tasks.task.': 'services.task_service.tasks',
+    'tasks.notification.': 'services.notification_service.tasks',
+}
 
 # Shared Celery app instance
-app = Celery("todoapp_distributed", broker=BROKER_URL)
+app = Celery("todoapp_distributed", broker=BROKER_URL, task_cls="utils.claimcheck:ClaimCheckTask")
 
 # Configure Celery
 app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
+    # Large task bodies are stored out of band, see utils/claimcheck.py
+    task_serializer=CLAIM_CHECK_SERIALIZER,
+    accept_content=['json', CLAIM_CHECK_SERIALIZER],
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
     task_track_started=True,
+    task_default_priority=PRIORITY_STANDARD,
+    imports=list(TASK_MODULES.values()),
+    # Workers poll their queues in the order given, so earlier lanes win
+    broker_transport_options={'queue_order_strategy': 'priority'},
     task_routes={
+        # Interactive lane: exact names take precedence over the service globs
+        'tasks.notification.send_instant_notification': INTERACTIVE,
+        'tasks.notification.flush_coalesced_notifications': INTERACTIVE,
+        'tasks.notification.send_task_completion_notification': INTERACTIVE,
+        'tasks.user.send_welcome_email': INTERACTIVE,
+        'tasks.task.notify_team_members': INTERACTIVE,
+        # Bulk lane
+        'tasks.notification.process_bulk_notifications': BULK,
+        'tasks.notification.run_daily_digest': BULK,
+        'tasks.notification.deliver_digest_chunk': BULK,
+        'tasks.notification.enforce_notification_retention': BULK,
+        'tasks.task.backup_task_data': BULK,
+        'tasks.task.generate_task_analytics': ANALYTICS,
+        'tasks.analytics.*': ANALYTICS,
+        # Standard lane: everything else stays on its service queue
         'tasks.user.*': {'queue': 'user_queue'},
         'tasks.task.*': {'queue': 'task_queue'},
         'tasks.notification.*': {'queue': 'notification_queue'},
-        'tasks.analytics.*': {'queue': 'analytics_queue'},
     }
 )
 
-# Tasks will be imported manually by the worker process
-# This avoids module discovery issues during startup 
\ No newline at end of file
+# Record task states for GET /jobs/<id> in every process that uses the app
+from . import jobs  # noqa: E402,F401
+
+def configure_worker_lanes(lanes):
+    """Make this worker consume the given lanes ("interactive,standard" or a list).
+
+    Queues are registered interactive first, so a worker serving several
+    lanes always drains interactive work before it picks up bulk work. The
+    prefetch multiplier is the smallest of the lanes served, so a long bulk
+    task never holds interactive messages in its prefetch buffer.
+    An explicit ``-Q`` on the command line still wins.
+    """
+    if isinstance(lanes, str):
+        lanes = [lane.strip() for lane in lanes.split(",") if lane.strip()]
+    unknown = set(lanes) - set(LANES)
+    if unknown:
+        raise ValueError(f"Unknown worker lanes: {', '.join(sorted(unknown))}")
+
+    selected = [lane for lane in LANES if lane in lanes]
+    configure_worker_queues(
+        [name for lane in selected for name in LANES[lane]["queues"]],
+        min(LANES[lane]["prefetch"] for lane in selected)
+    )
+    return selected
+
+def configure_worker_queues(queues, prefetch):
+    """Consume exactly ``queues``, polled in the given order"""
+    app.conf.task_queues = [Queue(name) for name in queues]
+    app.conf.worker_prefetch_multiplier = prefetch
+
+def send(name, *args, **kwargs):
+    """Queue the task called ``name`` without importing the module that defines it.
+
+    Routing, priority and serialization come from the app config, so an API
+    process can trigger another service's tasks without loading its code.
+    If the task is already registered here, its own apply_async runs, so
+    task classes such as DebouncedTask keep their behaviour. In eager mode
+    (tests, in-process runs) the module is imported so the task can run in place.
+    """
+    return send_with_options(name, args, kwargs)
+
+def send_with_options(name, args=(), kwargs=None, **options):
+    """send() with explicit args/kwargs and apply_async options such as ``task_id``"""
+    if name not in app.tasks and app.conf.task_always_eager:
+        for prefix, module in TASK_MODULES.items():
+            if name.startswith(prefix):
+                importlib.import_module(module)
+    if name in app.tasks:
+        return app.tasks[name].apply_async(args, kwargs, **options)
+    return app.send_task(name, args, kwargs, **options)
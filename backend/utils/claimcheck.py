@@ -0,0 +1,180 @@
+"""
+Claim check for large Celery messages
+
+Registered as the app's task serializer. Bodies under CLAIM_CHECK_THRESHOLD
+bytes are plain JSON, exactly as before. For larger ones, such as a bulk
+notification batch or a big sync payload, the task arguments are
+zlib-compressed and stored out of band with a CLAIM_CHECK_TTL. The message
+is still a normal task body, but its only argument is a short reference.
+
+The worker's consumer decodes messages as they arrive (prefetched ones
+included) and only ever sees that reference. ClaimCheckTask, the app's
+task base class, fetches the arguments when the task actually runs, in
+the pool process, and deletes the blob once the task has succeeded. A
+failed or retried task keeps its blob until the TTL, so the message can
+still be run again.
+
+Blobs go to Redis when REDIS_URL points at one. Otherwise they go to
+CLAIM_CHECK_DIR, which producers and workers must then share.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from celery import Task
+from kombu.serialization import register
+from kombu.utils.json import dumps as json_dumps, loads as json_loads
+from .config import CLAIM_CHECK_THRESHOLD, CLAIM_CHECK_TTL, CLAIM_CHECK_DIR
+from .redis_client import get_redis
+
+SERIALIZER = "claimcheck"
+CONTENT_TYPE = "application/x-claimcheck+json"
+MARKER = "__claim_check__"
+
+class RedisBlobStore:
+    def __init__(self, client):
+        self.client = client
+
+    def put(self, key, blob):
+        self.client.set(f"claimcheck:{key}", blob, ex=CLAIM_CHECK_TTL)
+
+    def get(self, key):
+        blob = self.client.get(f"claimcheck:{key}")
+        if blob is None:
+            raise LookupError(f"Claim-checked payload {key} is missing or expired")
+        return blob
+
+    def delete(self, key):
+        self.client.delete(f"claimcheck:{key}")
+
+    def count(self, original, stored):
+        pipe = self.client.pipeline()
+        pipe.hincrby("claimcheck:metrics", "messages", 1)
+        pipe.hincrby("claimcheck:metrics", "bytes_original", original)
+        pipe.hincrby("claimcheck:metrics", "bytes_on_broker", stored)
+        pipe.execute()
+
+    def metrics(self):
+        return {
+            (field.decode() if isinstance(field, bytes) else field): int(value)
+            for field, value in self.client.hgetall("claimcheck:metrics").items()
+        }
+
+class DirectoryBlobStore:
+    """One file per payload; expired files are swept at most once a minute"""
+
+    def __init__(self, path):
+        self.path = path
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def put(self, key, blob):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, f".{key}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, os.path.join(self.path, key))
+        self._sweep()
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.path, key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise LookupError(f"Claim-checked payload {key} is missing or expired") from None
+
+    def delete(self, key):
+        try:
+            os.remove(os.path.join(self.path, key))
+        except FileNotFoundError:
+            pass
+
+    def _sweep(self):
+        now = time.time()
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        for entry in os.scandir(self.path):
+            if entry.is_file() and now - entry.stat().st_mtime > CLAIM_CHECK_TTL:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def count(self, original, stored):
+        with self._lock:
+            for field, value in (("messages", 1), ("bytes_original", original), ("bytes_on_broker", stored)):
+                self._counters[field] = self._counters.get(field, 0) + value
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._counters)
+
+_store = None
+
+def get_store():
+    global _store
+    if _store is None:
+        client = get_redis()
+        _store = RedisBlobStore(client) if client is not None else DirectoryBlobStore(CLAIM_CHECK_DIR)
+    return _store
+
+def dumps(body):
+    data = json_dumps(body)
+    size = len(data.encode())
+    # Task message bodies are (args, kwargs, embed); anything else goes as is
+    if size < CLAIM_CHECK_THRESHOLD or not (isinstance(body, (list, tuple)) and len(body) == 3):
+        return data
+
+    args, kwargs, embed = body
+    key = uuid.uuid4().hex
+    store = get_store()
+    store.put(key, zlib.compress(json_dumps([args, kwargs]).encode()))
+    reference = json_dumps([[], {MARKER: {"key": key, "size": size}}, embed])
+    store.count(size, len(reference))
+    return reference
+
+def loads(data):
+    return json_loads(data)
+
+def fetch(reference):
+    """The ``(args, kwargs)`` a claim-checked message stands for"""
+    args, kwargs = json_loads(zlib.decompress(get_store().get(reference["key"])).decode())
+    return args, kwargs
+
+class ClaimCheckTask(Task):
+    """App-wide task base: swaps a claim-check reference for the real arguments at run time"""
+
+    def before_call(self, args, kwargs):
+        """Hook for subclasses: runs just before the task, with the real arguments"""
+
+    def __call__(self, *args, **kwargs):
+        reference = kwargs.pop(MARKER, None)
+        if reference is not None:
+            args, kwargs = fetch(reference)
+        self.before_call(args, kwargs)
+        result = super().__call__(*args, **kwargs)
+        if reference is None:
+            return result
+        try:
+            get_store().delete(reference["key"])
+        except Exception as e:
+            print(f"⚠️ Could not delete claim-checked payload {reference['key']}: {e}")
+        return result
+
+def claim_check_metrics():
+    """Messages claim-checked so far and the broker bytes that saved"""
+    metrics = get_store().metrics()
+    original = metrics.get("bytes_original", 0)
+    on_broker = metrics.get("bytes_on_broker", 0)
+    return {
+        "messages": metrics.get("messages", 0),
+        "bytes_original": original,
+        "bytes_on_broker": on_broker,
+        "bytes_saved": original - on_broker
+    }
+
+register(SERIALIZER, dumps, loads, content_type=CONTENT_TYPE, content_encoding="utf-8")
@@ -16,8 +16,136 @@ JWT_BLACKLIST_ENABLED        = True
 JWT_BLACKLIST_TOKEN_CHECKS   = ["access"]
 
 BROKER_URL      = os.getenv("BROKER_URL", "redis://localhost:6379/0")
+REDIS_URL       = os.getenv("REDIS_URL", BROKER_URL)  # Shared coordination state; non-redis URLs use in-process stand-ins
+WORKER_LANES    = os.getenv("WORKER_LANES", "interactive,standard,bulk")  # Latency lanes a worker consumes, see utils/broker.py
+
+# Database connection pool (per process; ignored for SQLite). Worker profiles in worker.py tune these
+DB_POOL_SIZE     = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW  = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT  = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE  = int(os.getenv("DB_POOL_RECYCLE", -1))
+
+# Job status store behind GET /jobs/<id>: how long results are kept, and the longest ?wait=
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 3600))
+JOB_WAIT_MAX   = float(os.getenv("JOB_WAIT_MAX", 30))
+
+# Claim check: task bodies at least this large travel out of band (Redis, else CLAIM_CHECK_DIR)
+CLAIM_CHECK_THRESHOLD = int(os.getenv("CLAIM_CHECK_THRESHOLD", 64 * 1024))  # bytes of JSON
+CLAIM_CHECK_TTL       = int(os.getenv("CLAIM_CHECK_TTL", 24 * 60 * 60))
+CLAIM_CHECK_DIR       = os.getenv("CLAIM_CHECK_DIR", "./blobs/claimcheck")
+
+# Debounced recompute tasks (utils/debounce.py): one run per key per window
+DEBOUNCE_WINDOW_SECONDS = float(os.getenv("DEBOUNCE_WINDOW_SECONDS", 10))
+DEBOUNCE_PENDING_TTL    = float(os.getenv("DEBOUNCE_PENDING_TTL", 300))  # Extra lifetime of a pending marker before it is presumed lost
+
+# Worker profile concurrency: greenlets for the I/O profile, processes for the CPU profile
+WORKER_IO_CONCURRENCY  = int(os.getenv("WORKER_IO_CONCURRENCY", 100))
+WORKER_CPU_CONCURRENCY = int(os.getenv("WORKER_CPU_CONCURRENCY", os.cpu_count() or 1))
 SMTP_SERVER   = os.getenv("SMTP_SERVER")
 SMTP_PORT     = int(os.getenv("SMTP_PORT", 587))
 SMTP_USERNAME = os.getenv("SMTP_USERNAME")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
-EMAIL_FROM    = os.getenv("EMAIL_FROM", "no-reply@example.com")
\ No newline at end of file
+SMTP_USE_TLS  = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+EMAIL_FROM    = os.getenv("EMAIL_FROM", "no-reply@example.com")
+
+# Scheduled checks record pending notifications, then fan delivery out in chunks
+NOTIFICATION_DELIVERY_CHUNK_SIZE   = int(os.getenv("NOTIFICATION_DELIVERY_CHUNK_SIZE", 50))
+NOTIFICATION_DELIVERY_MAX_PARALLEL = int(os.getenv("NOTIFICATION_DELIVERY_MAX_PARALLEL", 8))
+# A sweep re-queues rows whose delivery was lost (still pending or 'sending'
+# this long after they were queued) and retries failed rows, each up to MAX_ATTEMPTS
+# deliveries in total and at most REDELIVERY_BATCH rows per sweep
+NOTIFICATION_REDISPATCH_AFTER_SECONDS = float(os.getenv("NOTIFICATION_REDISPATCH_AFTER_SECONDS", 600))
+NOTIFICATION_RETRY_AFTER_SECONDS      = float(os.getenv("NOTIFICATION_RETRY_AFTER_SECONDS", 300))
+NOTIFICATION_MAX_ATTEMPTS             = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", 3))
+NOTIFICATION_REDELIVERY_BATCH         = int(os.getenv("NOTIFICATION_REDELIVERY_BATCH", 1000))
+
+# Per-process SMTP connection pool used by the notification mailer
+SMTP_POOL_SIZE                   = int(os.getenv("SMTP_POOL_SIZE", 4))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+SMTP_NOOP_INTERVAL               = float(os.getenv("SMTP_NOOP_INTERVAL", 30))
+
+# Asyncio delivery engine for notification batches
+SMTP_ASYNC_CONCURRENCY = int(os.getenv("SMTP_ASYNC_CONCURRENCY", 20))
+SMTP_SEND_TIMEOUT      = float(os.getenv("SMTP_SEND_TIMEOUT", 30))
+
+# Daily digest pipeline: users per keyset page, which is also one delivery chunk
+DIGEST_CHUNK_SIZE = int(os.getenv("DIGEST_CHUNK_SIZE", 500))
+# A run holds a lease on the day's checkpoint, renewed every chunk; a run that
+# stops renewing for this long is presumed dead and the next tick takes over
+DIGEST_LEASE_SECONDS = float(os.getenv("DIGEST_LEASE_SECONDS", 300))
+
+# Pub/sub for live notification streams (any non-redis URL uses an in-process hub)
+PUBSUB_URL               = os.getenv("PUBSUB_URL", BROKER_URL)
+PUBSUB_SUBSCRIBER_BUFFER = int(os.getenv("PUBSUB_SUBSCRIBER_BUFFER", 100))
+SSE_HEARTBEAT_SECONDS    = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+SSE_BACKLOG_LIMIT        = int(os.getenv("SSE_BACKLOG_LIMIT", 100))
+
+# Notification retention: older rows are archived to gzip JSONL files and purged
+NOTIFICATION_RETENTION_DAYS         = int(os.getenv("NOTIFICATION_RETENTION_DAYS", 90))
+NOTIFICATION_ARCHIVE_DIR            = os.getenv("NOTIFICATION_ARCHIVE_DIR", "./archive/notifications")
+NOTIFICATION_ARCHIVE_BATCH          = int(os.getenv("NOTIFICATION_ARCHIVE_BATCH", 1000))
+NOTIFICATION_PARTITION_MONTHS_AHEAD = int(os.getenv("NOTIFICATION_PARTITION_MONTHS_AHEAD", 3))
+
+# Coalesce bursts of instant notifications per (user, type); 0 disables.
+# Every instant email waits at least the window, so keep it to a few seconds
+COALESCE_WINDOW_SECONDS    = float(os.getenv("COALESCE_WINDOW_SECONDS", 5))
+COALESCE_MAX_DELAY_SECONDS = float(os.getenv("COALESCE_MAX_DELAY_SECONDS", 30))
+
+# process_bulk_notifications handles large batches in sub-chunks of this many items
+BULK_NOTIFICATION_CHUNK_SIZE = int(os.getenv("BULK_NOTIFICATION_CHUNK_SIZE", 1000))
+
+# Outbound email rate limits (messages/second; 0 disables). Overrides: "gmail.com=5,yahoo.com=2"
+SMTP_RATE_GLOBAL           = float(os.getenv("SMTP_RATE_GLOBAL", 50))
+SMTP_RATE_GLOBAL_BURST     = int(os.getenv("SMTP_RATE_GLOBAL_BURST", 100))
+SMTP_RATE_PER_DOMAIN       = float(os.getenv("SMTP_RATE_PER_DOMAIN", 10))
+SMTP_RATE_PER_DOMAIN_BURST = int(os.getenv("SMTP_RATE_PER_DOMAIN_BURST", 20))
+SMTP_RATE_DOMAIN_OVERRIDES = os.getenv("SMTP_RATE_DOMAIN_OVERRIDES", "")
+SMTP_RATE_MAX_WAIT         = float(os.getenv("SMTP_RATE_MAX_WAIT", 10))  # Longer waits defer batch sends
+
+# GET /notifications page size: default and the most a client may ask for
+NOTIFICATION_PAGE_SIZE     = int(os.getenv("NOTIFICATION_PAGE_SIZE", 50))
+NOTIFICATION_PAGE_SIZE_MAX = int(os.getenv("NOTIFICATION_PAGE_SIZE_MAX", 200))
+
+# JWT revocation: each process syncs a local Bloom filter of revoked token ids
+# at most this often, so a logout reaches other replicas within this delay
+REVOCATION_SYNC_SECONDS       = float(os.getenv("REVOCATION_SYNC_SECONDS", 2))
+REVOCATION_BLOOM_ERROR_RATE   = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+
+# Password hashing runs in a process pool off the request threads (0 workers = inline).
+# Give the method with its cost, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:1000000";
+# stored hashes made with anything else are upgraded on the user's next login.
+PASSWORD_HASH_METHOD  = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE   = int(os.getenv("PASSWORD_HASH_QUEUE", 32))  # Waiting hashes beyond the workers; more get 503
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+
+# GET /users/me profile cache: per-process LRU in front of an optional shared Redis tier
+PROFILE_CACHE_SIZE       = int(os.getenv("PROFILE_CACHE_SIZE", 10000))
+PROFILE_CACHE_TTL        = float(os.getenv("PROFILE_CACHE_TTL", 60))         # Local entries
+PROFILE_CACHE_SHARED_TTL = int(os.getenv("PROFILE_CACHE_SHARED_TTL", 600))  # Redis entries; 0 disables the tier
+# Put username/email in access tokens so /users/me needs no lookup at all
+PROFILE_CLAIMS_IN_TOKEN  = os.getenv("PROFILE_CLAIMS_IN_TOKEN", "false").lower() in ("1", "true", "yes")
+
+# Onboarding tasks for new users: "lazy" creates them on the user's first task
+# list/create, "eager" inserts them with the user row, "off" skips them
+ONBOARDING_TASKS = os.getenv("ONBOARDING_TASKS", "lazy").lower()
+
+# Per-client HTTP rate limits (token bucket shared through Redis); see utils/http_ratelimit.py
+RATE_LIMIT_ENABLED      = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_RATE         = float(os.getenv("RATE_LIMIT_RATE", 20))        # Requests/second per client and service
+RATE_LIMIT_BURST        = int(os.getenv("RATE_LIMIT_BURST", 60))
+RATE_LIMIT_AUTH_RATE    = float(os.getenv("RATE_LIMIT_AUTH_RATE", 0.2))  # Login/register attempts/second per IP
+RATE_LIMIT_AUTH_BURST   = int(os.getenv("RATE_LIMIT_AUTH_BURST", 10))
+# Addresses/CIDRs of reverse proxies whose X-Real-IP is believed; empty trusts no one,
+# so a service reached directly keys clients by the connecting address
+RATE_LIMIT_TRUSTED_PROXIES = [
+    proxy.strip() for proxy in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if proxy.strip()
+]
+
+# Celery workers keep a per-process cache of user records (id, username, email).
+# Any committed user write bumps a shared version; workers check it at most this often
+WORKER_USER_CACHE_SIZE          = int(os.getenv("WORKER_USER_CACHE_SIZE", 10000))
+WORKER_USER_CACHE_TTL           = float(os.getenv("WORKER_USER_CACHE_TTL", 300))
+WORKER_USER_CACHE_CHECK_SECONDS = float(os.getenv("WORKER_USER_CACHE_CHECK_SECONDS", 1))
+# API producers attach the task row to the messages that read it, so workers skip the re-read
+TASK_SNAPSHOTS_ENABLED          = os.getenv("TASK_SNAPSHOTS_ENABLED", "true").lower() in ("1", "true", "yes")
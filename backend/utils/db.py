@@ -1,7 +1,7 @@
 # backend/common/db.py
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from utils.config import DATABASE_URL
+from utils.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
 
 # Create engine with appropriate connect_args based on database type
 if DATABASE_URL.startswith("sqlite"):
@@ -10,7 +10,14 @@ if DATABASE_URL.startswith("sqlite"):
         connect_args={"check_same_thread": False}  # SQLite only
     )
 else:
-    engine = create_engine(DATABASE_URL)  # PostgreSQL, MySQL, etc.
+    engine = create_engine(
+        DATABASE_URL,  # PostgreSQL, MySQL, etc.
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True
+    )
 SessionLocal = sessionmaker(
     autoflush=False, autocommit=False, bind=engine
 )
@@ -0,0 +1,138 @@
+"""
+Debounced execution for idempotent recompute tasks
+
+A task declared with ``base=DebouncedTask`` is not queued again while an
+invocation with the same key is still pending. The first call schedules a
+run DEBOUNCE_WINDOW_SECONDS from now. Later calls with the same key return
+that pending run's AsyncResult and are counted as collapsed. The pending
+marker is cleared as soon as the run starts, and the run reads the
+database then, so it always works on the latest state. A call that
+arrives while the run is in progress schedules the next one, which gives
+at most one run per window per key.
+
+By default the key is every argument. ``debounce_args`` narrows it to the
+named arguments that identify the work, e.g. ``("user_id",)``.
+"""
+import hashlib
+import inspect
+import json
+import threading
+import time
+import uuid
+from .claimcheck import ClaimCheckTask
+from .config import DEBOUNCE_WINDOW_SECONDS, DEBOUNCE_PENDING_TTL
+from .redis_client import get_redis
+
+class RedisDebounceStore:
+    """Pending markers and counters shared by every producer and worker"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def claim(self, key, task_id, ttl):
+        """Mark ``key`` pending for ``task_id``; returns the id already pending, or None"""
+        while True:
+            if self.client.set(key, task_id, nx=True, px=int(ttl * 1000)):
+                return None
+            pending = self.client.get(key)
+            if pending is not None:
+                return pending.decode() if isinstance(pending, bytes) else pending
+            # The marker expired between SET and GET; try to claim it again
+
+    def release(self, key):
+        self.client.delete(key)
+
+    def count(self, task_name, event):
+        self.client.hincrby("debounce:metrics", f"{task_name}:{event}", 1)
+
+    def metrics(self):
+        return {
+            (field.decode() if isinstance(field, bytes) else field): int(value)
+            for field, value in self.client.hgetall("debounce:metrics").items()
+        }
+
+class LocalDebounceStore:
+    """In-process stand-in; only debounces calls made from this process"""
+
+    def __init__(self):
+        self._pending = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key, task_id, ttl):
+        now = time.monotonic()
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None and pending[1] > now:
+                return pending[0]
+            self._pending[key] = (task_id, now + ttl)
+            return None
+
+    def release(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def count(self, task_name, event):
+        with self._lock:
+            field = f"{task_name}:{event}"
+            self._counters[field] = self._counters.get(field, 0) + 1
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._counters)
+
+_store = None
+
+def get_store():
+    global _store
+    if _store is None:
+        client = get_redis()
+        _store = RedisDebounceStore(client) if client is not None else LocalDebounceStore()
+    return _store
+
+def debounce_metrics():
+    """Per task: how many calls were scheduled, collapsed into a pending run, and executed"""
+    summary = {}
+    for field, value in get_store().metrics().items():
+        task_name, event = field.rsplit(":", 1)
+        summary.setdefault(task_name, {"scheduled": 0, "collapsed": 0, "executed": 0})[event] = value
+    return summary
+
+class DebouncedTask(ClaimCheckTask):
+    """Celery task base that coalesces pending invocations with the same key"""
+
+    debounce_window = DEBOUNCE_WINDOW_SECONDS
+    debounce_args = None  # Argument names that form the key; None means all of them
+
+    def debounce_key(self, args, kwargs):
+        call = inspect.signature(self.run).bind_partial(*args, **kwargs).arguments
+        if self.debounce_args:
+            identity = {name: call.get(name) for name in self.debounce_args}
+            if any(value is not None for value in identity.values()):
+                call = identity
+        digest = hashlib.sha1(json.dumps(call, sort_keys=True, default=str).encode()).hexdigest()
+        return f"debounce:{self.name}:{digest}"
+
+    def apply_async(self, args=None, kwargs=None, task_id=None, **options):
+        args, kwargs = tuple(args or ()), dict(kwargs or {})
+        if self.app.conf.task_always_eager or self.debounce_window <= 0:
+            return super().apply_async(args, kwargs, task_id=task_id, **options)
+
+        store = get_store()
+        task_id = task_id or str(uuid.uuid4())
+        pending = store.claim(
+            self.debounce_key(args, kwargs), task_id, self.debounce_window + DEBOUNCE_PENDING_TTL
+        )
+        if pending is not None:
+            store.count(self.name, "collapsed")
+            return self.AsyncResult(pending)
+
+        store.count(self.name, "scheduled")
+        options.setdefault("countdown", self.debounce_window)
+        return super().apply_async(args, kwargs, task_id=task_id, **options)
+
+    def before_call(self, args, kwargs):
+        # Calls from here on need a fresh run; this one may read stale state
+        store = get_store()
+        store.release(self.debounce_key(args, kwargs))
+        store.count(self.name, "executed")
@@ -0,0 +1,212 @@
+"""
+Worker-side lookups of users and tasks that avoid the database when they can
+
+cached_user() keeps immutable UserRecords (id, username, email) in a
+per-process LRU for WORKER_USER_CACHE_TTL seconds. Every committed User
+write bumps a shared version number (see profile_cache). Each process
+reads that number at most every WORKER_USER_CACHE_CHECK_SECONDS and drops
+its whole cache when the number has moved. User writes are rare next to
+task traffic, so a coarse version is good enough.
+
+API producers pass ``snapshot=task_snapshot(task)`` to tasks that only
+read the task row. load_task() then builds the TaskRecord from the
+message and does not query. A snapshot shows the task as it was when the
+message was sent, which is what these tasks act on anyway.
+
+Lookups are counted per Celery task name. The counts are flushed to Redis
+in batches, so counting does not add a round trip per lookup.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+from .config import (
+    WORKER_USER_CACHE_SIZE, WORKER_USER_CACHE_TTL, WORKER_USER_CACHE_CHECK_SECONDS, TASK_SNAPSHOTS_ENABLED
+)
+from .lru import LRUCache
+from .redis_client import get_redis
+
+VERSION_KEY = "users:version"
+METRICS_KEY = "entity_cache:metrics"
+FLUSH_SECONDS = 10
+
+class UserRecord(NamedTuple):
+    id: int
+    username: str
+    email: str
+
+class TaskRecord(NamedTuple):
+    id: int
+    user_id: int
+    title: str
+    description: Optional[str]
+    due_date: Optional[datetime]
+    completed: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+_users = LRUCache(WORKER_USER_CACHE_SIZE, WORKER_USER_CACHE_TTL)
+_lock = threading.Lock()
+_local_version = 0          # Stands in for the Redis counter when there is none
+_seen_version = None
+_next_check = 0.0
+_counters = {}
+_flushed = {}               # Without Redis, flushed counts accumulate here
+_next_flush = 0.0
+
+def _current_version():
+    client = get_redis()
+    if client is None:
+        return _local_version
+    return int(client.get(VERSION_KEY) or 0)
+
+def _check_version():
+    """Drop the cached users if any user was written since the last check"""
+    global _seen_version, _next_check
+    now = time.monotonic()
+    if now < _next_check:
+        return
+    _next_check = now + WORKER_USER_CACHE_CHECK_SECONDS
+    try:
+        version = _current_version()
+    except Exception as e:
+        print(f"⚠️ Could not read the user cache version, clearing the cache: {e}")
+        _users.clear()
+        return
+    if version != _seen_version:
+        if _seen_version is not None:
+            _users.clear()
+        _seen_version = version
+
+def forget_user(user_id):
+    """Evict a user here and bump the shared version so other workers drop theirs"""
+    global _local_version, _next_check
+    _users.pop(int(user_id))
+    client = get_redis()
+    if client is None:
+        with _lock:
+            _local_version += 1
+    else:
+        client.incr(VERSION_KEY)
+    _next_check = 0.0  # Re-read the version on the next lookup in this process
+
+def _task_name():
+    from celery import current_task
+    return current_task.name if current_task else "unknown"
+
+def _count(event):
+    global _next_flush
+    field = f"{_task_name()}:{event}"
+    with _lock:
+        _counters[field] = _counters.get(field, 0) + 1
+        now = time.monotonic()
+        if now < _next_flush:
+            return
+        _next_flush = now + FLUSH_SECONDS
+        pending = dict(_counters)
+        _counters.clear()
+    _flush(pending)
+
+def _flush(counts):
+    client = get_redis()
+    if client is None:
+        with _lock:
+            for field, value in counts.items():
+                _flushed[field] = _flushed.get(field, 0) + value
+        return
+    try:
+        pipe = client.pipeline()
+        for field, value in counts.items():
+            pipe.hincrby(METRICS_KEY, field, value)
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Could not record entity cache metrics: {e}")
+
+def cached_user(db, user_id):
+    """The user's UserRecord, from this process's cache when possible; None if there is no such user"""
+    from services.user_service.models import User
+
+    user_id = int(user_id)
+    _check_version()
+    record = _users.get(user_id)
+    if record is not None:
+        _count("user_hits")
+        return record
+
+    _count("user_queries")
+    user = db.query(User).get(user_id)
+    if user is None:
+        return None
+    record = UserRecord(user.id, user.username, user.email)
+    _users.set(user_id, record)
+    return record
+
+def task_snapshot(task):
+    """JSON-safe copy of a task row to send along with a message, or None if snapshots are off"""
+    if not TASK_SNAPSHOTS_ENABLED:
+        return None
+    return {
+        "id": task.id,
+        "user_id": task.user_id,
+        "title": task.title,
+        "description": task.description,
+        "due_date": task.due_date.isoformat() if task.due_date else None,
+        "completed": task.completed,
+        "created_at": task.created_at.isoformat() if task.created_at else None,
+        "updated_at": task.updated_at.isoformat() if task.updated_at else None
+    }
+
+def _parse(value):
+    return datetime.fromisoformat(value) if value else None
+
+def load_task(db, task_id, snapshot=None):
+    """The task as a TaskRecord, from ``snapshot`` when it was sent, else from the database"""
+    from services.task_service.models import Task
+
+    if snapshot is not None and snapshot.get("id") == task_id:
+        _count("task_snapshots")
+        return TaskRecord(
+            id=snapshot["id"],
+            user_id=snapshot["user_id"],
+            title=snapshot["title"],
+            description=snapshot["description"],
+            due_date=_parse(snapshot["due_date"]),
+            completed=snapshot["completed"],
+            created_at=_parse(snapshot["created_at"]),
+            updated_at=_parse(snapshot["updated_at"])
+        )
+
+    _count("task_queries")
+    task = db.query(Task).get(task_id)
+    if task is None:
+        return None
+    return TaskRecord(task.id, task.user_id, task.title, task.description, task.due_date,
+                      task.completed, task.created_at, task.updated_at)
+
+def entity_cache_metrics():
+    """Per task: user and task lookups served from cache or snapshot vs. queried, and queries saved"""
+    with _lock:
+        pending = dict(_counters)
+        _counters.clear()
+    if pending:
+        _flush(pending)
+
+    client = get_redis()
+    if client is None:
+        with _lock:
+            raw = dict(_flushed)
+    else:
+        raw = {
+            (field.decode() if isinstance(field, bytes) else field): int(value)
+            for field, value in client.hgetall(METRICS_KEY).items()
+        }
+
+    summary = {}
+    for field, value in raw.items():
+        task_name, event = field.rsplit(":", 1)
+        summary.setdefault(task_name, {
+            "user_hits": 0, "user_queries": 0, "task_snapshots": 0, "task_queries": 0
+        })[event] = value
+    for counts in summary.values():
+        counts["queries_saved"] = counts["user_hits"] + counts["task_snapshots"]
+    return summary
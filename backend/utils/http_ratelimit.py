@@ -0,0 +1,104 @@
+"""
+Per-client rate limiting for the Flask services
+
+install_rate_limiting(app, scope) adds a before_request hook. It gives
+every client a token bucket of RATE_LIMIT_RATE requests/second (burst
+RATE_LIMIT_BURST) per service. A client is keyed by the user id in a
+valid JWT, or by IP address otherwise. Routes can add tighter limits with
+@rate_limit(...), for example on login. All limits are booked together in
+one reserve() on the shared GCRA limiter (utils/ratelimit.py), so a
+request costs at most one Redis round trip. Refused requests get 429 with
+Retry-After. If Redis is unreachable, requests are let through rather
+than failing the service.
+"""
+import ipaddress
+import math
+from functools import wraps
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from .config import RATE_LIMIT_ENABLED, RATE_LIMIT_RATE, RATE_LIMIT_BURST, RATE_LIMIT_TRUSTED_PROXIES
+from .ratelimit import Limit, get_limiter
+
+EXEMPT_ENDPOINTS = {"health", "static"}
+
+_TRUSTED_PROXIES = [ipaddress.ip_network(proxy, strict=False) for proxy in RATE_LIMIT_TRUSTED_PROXIES]
+
+def _from_trusted_proxy(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in network for network in _TRUSTED_PROXIES)
+
+def client_ip():
+    """The connecting address, or nginx's X-Real-IP when the connection comes from a trusted proxy"""
+    remote = request.remote_addr
+    if remote and request.headers.get("X-Real-IP") and _from_trusted_proxy(remote):
+        return request.headers["X-Real-IP"]  # Set by nginx from the connecting address
+    return remote or "unknown"
+
+def client_key(by="user"):
+    """``user:<id>`` for a request with a valid JWT (when ``by`` is "user"), else ``ip:<addr>``"""
+    if by == "user":
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            identity = None  # Invalid or expired token: the view will reject it; limit by IP
+        if identity is not None:
+            return f"user:{identity}"
+    return f"ip:{client_ip()}"
+
+def _too_many(wait):
+    response = jsonify({"msg": "Too many requests, slow down"})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, math.ceil(wait)))
+    return response
+
+def _route_limits(view):
+    """{key: Limit} for the @rate_limit declarations on ``view``"""
+    return {
+        f"http:{request.endpoint}:{client_key(by)}": limit
+        for limit, by in getattr(view, "_rate_limits", ())
+    }
+
+def _check(limits):
+    """None if the request may proceed, else the 429 response"""
+    if not RATE_LIMIT_ENABLED or not limits:
+        return None
+    try:
+        wait = get_limiter().reserve(limits, max_wait=0.0)
+    except Exception as e:
+        print(f"⚠️ Rate limiter unavailable, letting request through: {e}")
+        return None
+    return _too_many(wait) if wait > 0 else None
+
+def rate_limit(rate, burst, by="user"):
+    """Give a route its own bucket of ``rate`` requests/second per client (``by`` "user" or "ip").
+
+    Apps with install_rate_limiting() book it together with the service-wide
+    bucket; on other apps the decorator checks it by itself.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not g.get("rate_limits_checked"):
+                refused = _check(_route_limits(wrapper))
+                if refused is not None:
+                    return refused
+            return view(*args, **kwargs)
+        wrapper._rate_limits = getattr(view, "_rate_limits", ()) + ((Limit(rate, burst), by),)
+        return wrapper
+    return decorator
+
+def install_rate_limiting(app, scope, rate=RATE_LIMIT_RATE, burst=RATE_LIMIT_BURST):
+    """Rate-limit every request to ``app`` per client; ``scope`` names the service's bucket"""
+    @app.before_request
+    def _enforce_rate_limits():
+        if request.method == "OPTIONS" or request.endpoint in EXEMPT_ENDPOINTS or request.endpoint is None:
+            return None
+        limits = {f"http:{scope}:{client_key()}": Limit(rate, burst)}
+        limits.update(_route_limits(app.view_functions[request.endpoint]))
+        g.rate_limits_checked = True
+        return _check(limits)
+    return app
@@ -0,0 +1,220 @@
+"""
+Job status tracking: a small TTL result store for background work
+
+A mutating endpoint wraps the Celery tasks it triggers in a Job and returns
+its id. Worker-side signal handlers record each task's state (STARTED,
+SUCCESS, FAILURE, RETRY) with its result, and announce every change on the
+pub/sub hub. GET /jobs/<id>?wait=N then long-polls that announcement
+instead of the client polling list endpoints. Everything expires after
+JOB_RESULT_TTL seconds.
+
+A task id is mapped to its job before the task is sent, so tasks that no
+job tracks cost the signal handlers a single lookup and nothing else.
+"""
+import json
+import threading
+import time
+import uuid
+from datetime import datetime
+from celery.signals import task_prerun, task_success, task_failure, task_retry
+from .config import JOB_RESULT_TTL
+from .pubsub import get_hub
+from .redis_client import get_redis
+
+class RedisJobStore:
+    """Job records and task states shared by every API replica and worker"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def save_job(self, job):
+        pipe = self.client.pipeline()
+        pipe.set(f"jobs:job:{job['id']}", json.dumps(job), ex=JOB_RESULT_TTL)
+        for task_id in job["tasks"]:
+            pipe.set(f"jobs:task-job:{task_id}", job["id"], ex=JOB_RESULT_TTL)
+        pipe.execute()
+
+    def map_task(self, task_id, job_id):
+        self.client.set(f"jobs:task-job:{task_id}", job_id, ex=JOB_RESULT_TTL)
+
+    def get_job(self, job_id):
+        raw = self.client.get(f"jobs:job:{job_id}")
+        return json.loads(raw) if raw else None
+
+    def job_for_task(self, task_id):
+        job_id = self.client.get(f"jobs:task-job:{task_id}")
+        return job_id.decode() if isinstance(job_id, bytes) else job_id
+
+    def set_state(self, task_id, state):
+        self.client.set(f"jobs:task:{task_id}", json.dumps(state, default=str), ex=JOB_RESULT_TTL)
+
+    def get_states(self, task_ids):
+        if not task_ids:
+            return []
+        return [json.loads(raw) if raw else None
+                for raw in self.client.mget([f"jobs:task:{task_id}" for task_id in task_ids])]
+
+class LocalJobStore:
+    """In-process stand-in; only sees jobs run in this process (eager mode, tests)"""
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def _set(self, key, value):
+        self._items[key] = (value, time.monotonic() + JOB_RESULT_TTL)
+
+    def _get(self, key):
+        item = self._items.get(key)
+        if item is None or item[1] < time.monotonic():
+            return None
+        return item[0]
+
+    def save_job(self, job):
+        with self._lock:
+            self._set(("job", job["id"]), job)
+            for task_id in job["tasks"]:
+                self._set(("task-job", task_id), job["id"])
+
+    def map_task(self, task_id, job_id):
+        with self._lock:
+            self._set(("task-job", task_id), job_id)
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self._get(("job", job_id))
+
+    def job_for_task(self, task_id):
+        with self._lock:
+            return self._get(("task-job", task_id))
+
+    def set_state(self, task_id, state):
+        with self._lock:
+            self._set(("task", task_id), json.loads(json.dumps(state, default=str)))
+
+    def get_states(self, task_ids):
+        with self._lock:
+            return [self._get(("task", task_id)) for task_id in task_ids]
+
+_store = None
+
+def get_store():
+    global _store
+    if _store is None:
+        client = get_redis()
+        _store = RedisJobStore(client) if client is not None else LocalJobStore()
+    return _store
+
+def job_channel(job_id):
+    return f"jobs:{job_id}"
+
+class Job:
+    """The background tasks started by one request, tracked under one id"""
+
+    def __init__(self, kind, user_id=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.user_id = str(user_id) if user_id is not None else None
+        self.tasks = {}
+
+    def dispatch(self, task, *args, **kwargs):
+        """Queue ``task`` (a task, or a task name for broker.send) as a step of this job"""
+        # Map the id first: an eager or fast worker records the task's states
+        # only if it can already find the job
+        task_id = str(uuid.uuid4())
+        store = get_store()
+        store.map_task(task_id, self.id)
+        if isinstance(task, str):
+            from .broker import send_with_options
+            result, name = send_with_options(task, args, kwargs, task_id=task_id), task
+        else:
+            result, name = task.apply_async(args, kwargs, task_id=task_id), task.name
+        if result.id != task_id:
+            store.map_task(result.id, self.id)  # Collapsed into a pending run (DebouncedTask)
+        self.tasks[result.id] = name
+        return result
+
+    def save(self):
+        """Store the job; call once every step has been dispatched"""
+        get_store().save_job({
+            "id": self.id,
+            "kind": self.kind,
+            "user_id": self.user_id,
+            "created_at": datetime.utcnow().isoformat(),
+            "tasks": self.tasks
+        })
+        return self.id
+
+def job_status(job_id):
+    """Current state of a job and its steps, or None if unknown or expired"""
+    store = get_store()
+    job = store.get_job(job_id)
+    if job is None:
+        return None
+
+    steps = []
+    for (task_id, name), state in zip(job["tasks"].items(), store.get_states(list(job["tasks"]))):
+        steps.append(dict(state or {"state": "PENDING"}, id=task_id, task=name))
+
+    states = {step["state"] for step in steps}
+    if "FAILURE" in states:
+        overall = "FAILURE"
+    elif states <= {"SUCCESS"}:
+        overall = "SUCCESS"
+    elif states & {"STARTED", "SUCCESS", "RETRY"}:
+        overall = "STARTED"
+    else:
+        overall = "PENDING"
+
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "user_id": job["user_id"],
+        "created_at": job["created_at"],
+        "state": overall,
+        "done": overall in ("SUCCESS", "FAILURE"),
+        "steps": steps
+    }
+
+def wait_for_job(job_id, timeout):
+    """job_status(), after waiting up to ``timeout`` seconds for the job to finish.
+
+    Wakes on the job's pub/sub announcements, and re-reads the store at
+    least once a second in case an announcement was missed.
+    """
+    deadline = time.monotonic() + timeout
+    with get_hub().subscribe(job_channel(job_id)) as subscription:
+        while True:
+            status = job_status(job_id)
+            remaining = deadline - time.monotonic()
+            if status is None or status["done"] or remaining <= 0:
+                return status
+            subscription.get(timeout=min(remaining, 1.0))
+
+def _record(task_id, state):
+    """Store the state of a task that belongs to a job and wake any waiters; never fails the task itself"""
+    try:
+        store = get_store()
+        job_id = store.job_for_task(task_id)
+        if job_id is None:
+            return
+        store.set_state(task_id, dict(state, updated_at=datetime.utcnow().isoformat()))
+        get_hub().publish(job_channel(job_id), {"task_id": task_id, "state": state["state"]})
+    except Exception as e:
+        print(f"⚠️ Could not record job state for task {task_id}: {e}")
+
+@task_prerun.connect
+def _on_task_start(task_id=None, **kwargs):
+    _record(task_id, {"state": "STARTED"})
+
+@task_success.connect
+def _on_task_success(sender=None, result=None, **kwargs):
+    _record(sender.request.id, {"state": "SUCCESS", "result": result})
+
+@task_failure.connect
+def _on_task_failure(task_id=None, exception=None, **kwargs):
+    _record(task_id, {"state": "FAILURE", "error": str(exception)})
+
+@task_retry.connect
+def _on_task_retry(request=None, reason=None, **kwargs):
+    _record(request.id, {"state": "RETRY", "error": str(reason)})
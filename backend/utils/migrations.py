@@ -0,0 +1,197 @@
+"""
+Versioned schema migrations for the users, tasks and notifications tables
+
+Each migration runs once per database, in order. Its version is recorded in
+``schema_migrations`` when it succeeds. ``python manage.py migrate`` applies
+whatever is pending.
+
+Index builds on Postgres use CREATE INDEX CONCURRENTLY, so writes keep
+flowing while a large table is indexed. That cannot run inside a
+transaction, so migrations are not atomic. Every step is written to be
+safe to repeat (IF [NOT] EXISTS, invalid leftovers are rebuilt), and a
+migration that fails halfway can simply be run again.
+"""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations", metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+def _autocommit(engine):
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+def _partitions(conn, table):
+    """Child tables of ``table`` if it is partitioned (Postgres), else None"""
+    if conn.dialect.name != "postgresql":
+        return None
+    if conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :name"
+    ), {"name": table}).first() is None:
+        return None
+    return conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :name ORDER BY c.relname"
+    ), {"name": table}).scalars().all()
+
+def _drop_if_invalid(conn, name):
+    """Remove an index left INVALID by an interrupted concurrent build"""
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid is not None:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+def create_index(engine, name, table, columns, where=None):
+    """Create an index if it is missing, without blocking writes on Postgres.
+
+    ``where`` makes it a partial index. Write boolean literals as ``{false}``
+    / ``{true}``, so the predicate matches how each dialect renders the
+    queries that should use it.
+    """
+    with _autocommit(engine) as conn:
+        postgres = conn.dialect.name == "postgresql"
+        predicate = ""
+        if where:
+            predicate = " WHERE " + where.format(
+                false="false" if postgres else "0", true="true" if postgres else "1"
+            )
+        if not postgres:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns}){predicate}"))
+            return
+
+        partitions = _partitions(conn, table)
+        if partitions is None:
+            _drop_if_invalid(conn, name)
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns}){predicate}"))
+            return
+
+        # Partitioned tables cannot be indexed concurrently: build each
+        # partition's index concurrently and attach it to the parent's
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} ({columns}){predicate}"))
+        suffix = name[len(f"ix_{table}_"):] if name.startswith(f"ix_{table}_") else name
+        for partition in partitions:
+            child = f"{partition}_{suffix}"[:63]
+            _drop_if_invalid(conn, child)
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} ({columns}){predicate}"
+            ))
+            conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+
+def drop_index(engine, name, table):
+    """Drop an index if it exists, without blocking writes on Postgres"""
+    with _autocommit(engine) as conn:
+        if conn.dialect.name != "postgresql":
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        elif _partitions(conn, table) is not None:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))  # Drops the partitions' indexes too
+        else:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+def add_column(engine, table, name, ddl):
+    """ALTER TABLE ... ADD COLUMN unless the column is already there"""
+    if name in {column["name"] for column in inspect(engine).get_columns(table)}:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+def _baseline(engine):
+    """Tables as create_all used to make them at service start-up"""
+    from .db import Base
+    import services.user_service.models  # noqa: F401
+    import services.task_service.models  # noqa: F401
+    import services.notification_service.models  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+
+def _hot_path_indexes(engine):
+    # Due-soon / overdue scans and the digest join only look at open tasks
+    create_index(engine, "ix_tasks_open_due_date", "tasks", "due_date", where="completed = {false}")
+    create_index(engine, "ix_tasks_open_user_id_due_date", "tasks", "user_id, due_date",
+                 where="completed = {false}")
+    # Per-user listing and completed counts; makes the user_id-only index redundant
+    create_index(engine, "ix_tasks_user_id_completed", "tasks", "user_id, completed")
+    drop_index(engine, "ix_tasks_user_id", "tasks")
+
+    # Dedupe of scheduled notifications by (task_id, notify_type)
+    create_index(engine, "ix_notifications_task_id_notify_type", "notifications", "task_id, notify_type")
+    drop_index(engine, "ix_notifications_task_id", "notifications")
+    # History pages; databases created before keyset pagination lack these
+    create_index(engine, "ix_notifications_user_sent_at_id", "notifications",
+                 "user_id, sent_at DESC, id DESC")
+    create_index(engine, "ix_notifications_user_type_sent_at_id", "notifications",
+                 "user_id, notify_type, sent_at DESC, id DESC")
+
+def _onboarding_pending(engine):
+    # A constant default is a metadata-only change on Postgres 11+, no table rewrite
+    false = "false" if engine.dialect.name == "postgresql" else "0"
+    add_column(engine, "users", "onboarding_pending", f"BOOLEAN NOT NULL DEFAULT {false}")
+
+def _digest_lease(engine):
+    add_column(engine, "digest_checkpoints", "lease_owner", "VARCHAR")
+    add_column(engine, "digest_checkpoints", "lease_until", "TIMESTAMP")
+
+def _notification_status(engine):
+    # Databases from before this series have neither column: create_all in
+    # the baseline only creates missing tables, it never alters existing ones
+    false = "false" if engine.dialect.name == "postgresql" else "0"
+    add_column(engine, "notifications", "status", "VARCHAR NOT NULL DEFAULT 'sent'")
+    add_column(engine, "notifications", "read", f"BOOLEAN NOT NULL DEFAULT {false}")
+    # Counters for users that have none yet (every user, on such a database)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO notification_unread_counters (user_id, unread_count) "
+            "SELECT user_id, COUNT(*) FROM notifications "
+            f"WHERE read = {false} AND status <> 'failed' AND user_id NOT IN "
+            "(SELECT user_id FROM notification_unread_counters) "
+            "GROUP BY user_id"
+        ))
+
+def _notification_redelivery(engine):
+    add_column(engine, "notifications", "attempts", "INTEGER NOT NULL DEFAULT 0")
+    add_column(engine, "notifications", "queued_at", "TIMESTAMP")
+    create_index(engine, "ix_notifications_undelivered", "notifications", "status, queued_at",
+                 where="status <> 'sent'")
+
+def _notification_delivered_at(engine):
+    add_column(engine, "notifications", "delivered_at", "TIMESTAMP")
+
+# (version, description, step). Append only; never edit an applied migration.
+MIGRATIONS = [
+    (1, "baseline tables", _baseline),
+    (2, "hot-path indexes for tasks and notifications", _hot_path_indexes),
+    (3, "users.onboarding_pending for lazily created onboarding tasks", _onboarding_pending),
+    (4, "lease columns on digest_checkpoints", _digest_lease),
+    (5, "notifications.status/read on pre-migration databases, backfilled unread counters", _notification_status),
+    (6, "notification delivery attempts and redelivery index", _notification_redelivery),
+    (7, "notifications.delivered_at, so delivery leaves sent_at alone", _notification_delivered_at),
+]
+
+def applied_versions(engine):
+    metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        return set(conn.execute(schema_migrations.select().with_only_columns(schema_migrations.c.version)).scalars())
+
+def pending_migrations(engine):
+    applied = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+def migrate(engine):
+    """Apply every pending migration in order; returns the versions applied"""
+    done = []
+    for version, description, step in pending_migrations(engine):
+        print(f"🔧 Migration {version:04d}: {description}")
+        step(engine)
+        with engine.begin() as conn:
+            conn.execute(schema_migrations.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        done.append(version)
+    return done
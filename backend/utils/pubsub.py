@@ -0,0 +1,122 @@
+"""
+Shared publish/subscribe hub for pushing events from workers to API replicas
+"""
+import json
+import threading
+import time
+from queue import Queue, Empty, Full
+from .config import PUBSUB_URL, PUBSUB_SUBSCRIBER_BUFFER
+
+CHANNEL_PREFIX = "todoapp:"
+
+class Subscription:
+    """A local subscriber: one bounded queue fed by the hub's dispatcher"""
+
+    def __init__(self, hub, channel):
+        self.hub = hub
+        self.channel = channel
+        self.queue = Queue(maxsize=PUBSUB_SUBSCRIBER_BUFFER)
+        # Set when the subscriber fell too far behind and messages were dropped
+        self.overflowed = False
+
+    def get(self, timeout):
+        """Next message, or None if nothing arrived within ``timeout`` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class LocalHub:
+    """In-process stand-in: publishers and subscribers must share the process"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel) -> Subscription:
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, message):
+        self._dispatch(channel, json.dumps(message))
+
+    def _dispatch(self, channel, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        if not subscribers:
+            return
+        message = json.loads(data)
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except Full:
+                subscription.overflowed = True
+
+class RedisHub(LocalHub):
+    """Fan-out across replicas through Redis pub/sub.
+
+    Each process holds a single pattern subscription, however many local
+    subscribers it serves, and dispatches incoming messages to their queues.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, channel) -> Subscription:
+        self._ensure_listener()
+        return super().subscribe(channel)
+
+    def publish(self, channel, message):
+        self._redis.publish(CHANNEL_PREFIX + channel, json.dumps(message))
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="pubsub-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                for message in pubsub.listen():
+                    channel = message["channel"].decode()[len(CHANNEL_PREFIX):]
+                    self._dispatch(channel, message["data"])
+            except Exception as e:
+                print(f"⚠️ Pub/sub listener lost Redis connection: {e}")
+                time.sleep(1)
+
+_hub = None
+_hub_lock = threading.Lock()
+
+def get_hub():
+    """Process-wide hub; Redis when PUBSUB_URL is a redis:// URL, else local"""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = RedisHub(PUBSUB_URL) if PUBSUB_URL.startswith("redis") else LocalHub()
+        return _hub
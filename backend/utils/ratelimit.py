@@ -0,0 +1,92 @@
+"""
+Token-bucket rate limiting shared across processes (GCRA)
+
+Each key has a rate (tokens per second) and a burst (bucket size). Instead
+of a token count we store the bucket's "theoretical arrival time", so a
+reservation is a single read-modify-write per key. reserve() books a slot
+on every given key at once and returns how long the caller must wait for
+it; when that wait would exceed ``max_wait`` nothing is booked.
+"""
+import threading
+import time
+from typing import NamedTuple
+from .redis_client import get_redis
+
+class Limit(NamedTuple):
+    rate: float   # tokens per second
+    burst: int    # tokens available at once
+
+_RESERVE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local max_wait = tonumber(ARGV[1])
+local wait = 0
+local starts = {}
+for i, key in ipairs(KEYS) do
+    local interval = 1 / tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then tat = now end
+    starts[i] = tat
+    local key_wait = tat - now - (burst - 1) * interval
+    if key_wait > wait then wait = key_wait end
+end
+if wait > max_wait then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local interval = 1 / tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local tat = starts[i] + interval
+    redis.call('SET', key, tostring(tat), 'PX', math.ceil((tat - now + burst * interval) * 1000) + 1000)
+end
+return tostring(wait)
+"""
+
+class RedisRateLimiter:
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(_RESERVE_SCRIPT)
+
+    def reserve(self, limits, max_wait=0.0):
+        """Book one token on every key in ``limits`` ({key: Limit}).
+
+        Returns the seconds to wait before using the slot. A value greater
+        than ``max_wait`` means the request was refused and nothing was booked.
+        """
+        keys = list(limits)
+        args = [max_wait]
+        for key in keys:
+            args.extend([limits[key].rate, limits[key].burst])
+        return float(self._script(keys=[f"ratelimit:{key}" for key in keys], args=args))
+
+class LocalRateLimiter:
+    """In-process stand-in with the same arithmetic"""
+
+    def __init__(self):
+        self._tats = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, limits, max_wait=0.0):
+        now = time.time()
+        with self._lock:
+            wait = 0.0
+            starts = {}
+            for key, limit in limits.items():
+                interval = 1 / limit.rate
+                starts[key] = max(self._tats.get(key, now), now)
+                wait = max(wait, starts[key] - now - (limit.burst - 1) * interval)
+            if wait > max_wait:
+                return wait
+            for key, limit in limits.items():
+                self._tats[key] = starts[key] + 1 / limit.rate
+            return wait
+
+_limiter = None
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        client = get_redis()
+        _limiter = RedisRateLimiter(client) if client is not None else LocalRateLimiter()
+    return _limiter
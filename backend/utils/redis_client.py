@@ -0,0 +1,23 @@
+"""
+Shared Redis client for coordination state (buffers, limits, caches)
+"""
+import threading
+from .config import REDIS_URL
+
+_client = None
+_lock = threading.Lock()
+
+def get_redis():
+    """Process-wide Redis client, or None when REDIS_URL is not a redis:// URL.
+
+    Callers fall back to an in-process stand-in when this returns None, which
+    is how tests and single-process development run.
+    """
+    global _client
+    if not REDIS_URL.startswith("redis"):
+        return None
+    with _lock:
+        if _client is None:
+            import redis
+            _client = redis.Redis.from_url(REDIS_URL)
+        return _client
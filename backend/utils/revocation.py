@@ -0,0 +1,130 @@
+"""
+Shared JWT revocation store with a local Bloom filter in front
+
+Logout revokes a token's ``jti`` until the token's own ``exp``; after that
+the signature check rejects it anyway, so entries never outlive it. Every
+service registers the same blocklist check (register_revocation_check).
+
+Redis holds the authoritative entries (``jwt:revoked:<jti>``, expiring at
+``exp``), plus a sorted set of live jtis and a version counter. Each process
+keeps a Bloom filter of that set and re-syncs it at most every
+REVOCATION_SYNC_SECONDS, and only when the version has changed. A token the
+filter has never seen is not revoked, with no network round trip; a filter
+hit is confirmed against Redis, so false positives cost one GET, never a
+wrong 401. A logout is seen by the process that handled it immediately and
+by the others within one sync interval.
+"""
+import hashlib
+import math
+import threading
+import time
+from .config import REVOCATION_SYNC_SECONDS, REVOCATION_BLOOM_ERROR_RATE
+from .redis_client import get_redis
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate=REVOCATION_BLOOM_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class RedisRevocationStore:
+    """Revocations shared by every replica of every service"""
+
+    def __init__(self, client, sync_seconds=REVOCATION_SYNC_SECONDS):
+        self.client = client
+        self.sync_seconds = sync_seconds
+        self._filter = BloomFilter(1024)
+        self._version = None
+        self._synced_at = 0.0
+        self._sync_lock = threading.Lock()
+
+    def revoke(self, jti, exp):
+        now = time.time()
+        if exp <= now:
+            return
+        pipe = self.client.pipeline()
+        pipe.set(f"jwt:revoked:{jti}", 1, exat=int(math.ceil(exp)))
+        pipe.zadd("jwt:revoked", {jti: exp})
+        pipe.zremrangebyscore("jwt:revoked", "-inf", now)
+        pipe.incr("jwt:revoked:version")
+        pipe.execute()
+        self._filter.add(jti)
+
+    def _sync(self):
+        """Rebuild the filter if another process revoked something since the last sync"""
+        if time.monotonic() - self._synced_at < self.sync_seconds:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return  # Another thread is syncing; keep using the current filter
+        try:
+            version = self.client.get("jwt:revoked:version")
+            if version != self._version:
+                jtis = self.client.zrangebyscore("jwt:revoked", time.time(), "+inf")
+                bloom = BloomFilter(max(1024, 2 * len(jtis)))
+                for jti in jtis:
+                    bloom.add(jti.decode() if isinstance(jti, bytes) else jti)
+                self._filter, self._version = bloom, version
+            self._synced_at = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def is_revoked(self, jti):
+        self._sync()
+        if jti not in self._filter:
+            return False
+        return bool(self.client.exists(f"jwt:revoked:{jti}"))
+
+class LocalRevocationStore:
+    """In-process stand-in; only sees logouts handled by this process"""
+
+    def __init__(self):
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti, exp):
+        now = time.time()
+        with self._lock:
+            self._revoked = {key: until for key, until in self._revoked.items() if until > now}
+            if exp > now:
+                self._revoked[jti] = exp
+
+    def is_revoked(self, jti):
+        with self._lock:
+            exp = self._revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+_store = None
+
+def get_store():
+    global _store
+    if _store is None:
+        client = get_redis()
+        _store = RedisRevocationStore(client) if client is not None else LocalRevocationStore()
+    return _store
+
+def revoke_token(jwt_payload):
+    """Revoke the token with these claims until it expires"""
+    get_store().revoke(jwt_payload["jti"], jwt_payload["exp"])
+
+def register_revocation_check(jwt):
+    """Make a JWTManager reject revoked tokens on every protected request"""
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload) -> bool:
+        return get_store().is_revoked(jwt_payload["jti"])
+    return jwt
@@ -1,35 +1,117 @@
 #!/usr/bin/env python3
 """
-Celery worker script that imports all tasks and starts the worker
+Celery worker/beat entrypoint for the shared app
+
+Pick the pool profile that matches the work this worker will do:
+
+    python worker.py worker --profile io     # gevent, many greenlets: SMTP, external sync
+    python worker.py worker --profile cpu    # prefork, one process per core: analytics, backups
+    python worker.py worker                  # prefork over WORKER_LANES (previous behaviour)
+
+WORKER_PROFILE in the environment does the same as --profile. An explicit
+-P, -c or -Q on the command line still wins over the profile.
 """
 import os
 import sys
 
+PROFILES = {
+    "default": {
+        "pool": None, "queues": None, "prefetch": None, "db": {}
+    },
+    # I/O-bound tasks spend their time waiting on SMTP and HTTP. Greenlets are
+    # cheap, so run many of them and give the shared engine a pool to match.
+    "io": {
+        "pool": "gevent",
+        "queues": ["interactive_queue", "notification_queue", "user_queue"],
+        "prefetch": 1,
+        "db": {"DB_POOL_SIZE": "20", "DB_MAX_OVERFLOW": "20", "DB_POOL_TIMEOUT": "10"},
+    },
+    # CPU/DB-bound tasks need real parallelism: one process per core, each
+    # running one task at a time, so each child needs only a couple of connections.
+    "cpu": {
+        "pool": "prefork",
+        "queues": ["analytics_queue", "bulk_queue", "task_queue"],
+        "prefetch": 1,
+        "db": {"DB_POOL_SIZE": "2", "DB_MAX_OVERFLOW": "0"},
+    },
+}
+
+def _pop_profile(argv):
+    """Take ``--profile NAME`` / ``--profile=NAME`` out of argv; Celery does not know it"""
+    for i, arg in enumerate(argv):
+        if arg == "--profile" and i + 1 < len(argv):
+            name = argv[i + 1]
+            del argv[i:i + 2]
+            return name
+        if arg.startswith("--profile="):
+            del argv[i]
+            return arg.split("=", 1)[1]
+    return None
+
+def _option_value(argv, short, long):
+    """Value of ``-X value`` / ``--long value`` / ``--long=value`` in argv, or None"""
+    for i, arg in enumerate(argv):
+        if arg in (short, long) and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith(long + "="):
+            return arg.split("=", 1)[1]
+    return None
+
+profile_name = _pop_profile(sys.argv) or os.getenv("WORKER_PROFILE", "default")
+if profile_name not in PROFILES:
+    sys.exit(f"❌ Unknown worker profile '{profile_name}' (choose from {', '.join(PROFILES)})")
+profile = PROFILES[profile_name]
+is_worker = "worker" in sys.argv[1:]
+
+# Engine settings are read when utils.db is first imported, so set them now
+for key, value in profile["db"].items():
+    os.environ.setdefault(key, value)
+
+if is_worker and profile["pool"] and _option_value(sys.argv, "-P", "--pool") is None:
+    sys.argv += ["--pool", profile["pool"]]
+
+if is_worker:
+    # gevent must patch the standard library before anything else is imported
+    from celery import maybe_patch_concurrency
+    maybe_patch_concurrency(sys.argv)
+    if _option_value(sys.argv, "-P", "--pool") == "gevent":
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()  # Let Postgres queries yield to other greenlets
+        except ImportError:
+            print("⚠️  psycogreen not installed: Postgres queries will block the gevent hub")
+
 # Add the backend directory to Python path
 sys.path.insert(0, '/app/backend')
 
 # Import the Celery app
-from utils.broker import app
-
-# Import all task modules to register them with Celery
-try:
-    from services.user_service.tasks import *
-    print("✅ User service tasks imported successfully")
-except ImportError as e:
-    print(f"⚠️  Could not import user service tasks: {e}")
-
-try:
-    from services.task_service.tasks import *
-    print("✅ Task service tasks imported successfully")
-except ImportError as e:
-    print(f"⚠️  Could not import task service tasks: {e}")
-
-try:
-    from services.notification_service.tasks import *
-    print("✅ Notification service tasks imported successfully")
-except ImportError as e:
-    print(f"⚠️  Could not import notification service tasks: {e}")
+from celery.signals import worker_process_init
+from utils.broker import app, configure_worker_lanes, configure_worker_queues
+from utils.config import WORKER_LANES, WORKER_IO_CONCURRENCY, WORKER_CPU_CONCURRENCY
+from utils.db import engine
+
+PROFILE_CONCURRENCY = {"io": WORKER_IO_CONCURRENCY, "cpu": WORKER_CPU_CONCURRENCY}
+
+if is_worker and profile_name in PROFILE_CONCURRENCY and _option_value(sys.argv, "-c", "--concurrency") is None:
+    sys.argv += ["--concurrency", str(PROFILE_CONCURRENCY[profile_name])]
+
+if profile["queues"]:
+    configure_worker_queues(profile["queues"], profile["prefetch"])
+    print(f"🧰 Worker profile '{profile_name}': {', '.join(profile['queues'])}")
+else:
+    # Consume only the latency lanes this worker is meant to serve
+    print(f"🚦 Worker lanes: {', '.join(configure_worker_lanes(WORKER_LANES))}")
+
+@worker_process_init.connect
+def reset_db_pool(**kwargs):
+    """Forked children must not reuse the parent's pooled connections"""
+    engine.dispose(close=False)
+
+# Task modules are imported by name (app.conf.imports) when the worker or
+# beat actually starts, so `python worker.py --help` and friends stay fast
+if "beat" in sys.argv[1:]:
+    import services.notification_service.worker  # noqa: F401  (beat schedule)
 
 if __name__ == '__main__':
-    # Start the worker
-    app.start() 
\ No newline at end of file
+    # Start the worker (Celery's parser expects the arguments without the script name)
+    app.start(sys.argv[1:])
@@ -49,15 +49,29 @@ export const taskApi = {
   }),
   deleteTask: (id, token) => axios.delete(`${TASK_API}/tasks/${id}`, {
     headers: { Authorization: `Bearer ${token}` }
+  }),
+  // Background work started by create/update; wait (seconds) long-polls until it finishes
+  getJob: (jobId, token, wait = 0) => axios.get(`${TASK_API}/jobs/${jobId}`, {
+    headers: { Authorization: `Bearer ${token}` },
+    params: { wait }
   })
 };
 
 // Notification Service API calls
 export const notificationApi = {
-  getNotifications: (token) => axios.get(`${NOTIFICATION_API}/notifications`, {
-    headers: { Authorization: `Bearer ${token}` }
+  // params: { limit, before, after, type, task_id }; next/prev cursors come back
+  // in the X-Next-Cursor / X-Prev-Cursor response headers
+  getNotifications: (token, params = {}) => axios.get(`${NOTIFICATION_API}/notifications`, {
+    headers: { Authorization: `Bearer ${token}` },
+    params
   }),
   markAsRead: (id, token) => axios.put(`${NOTIFICATION_API}/notifications/${id}/read`, {}, {
     headers: { Authorization: `Bearer ${token}` }
+  }),
+  markAllAsRead: (token) => axios.post(`${NOTIFICATION_API}/notifications/read-all`, {}, {
+    headers: { Authorization: `Bearer ${token}` }
+  }),
+  getUnreadCount: (token) => axios.get(`${NOTIFICATION_API}/notifications/unread-count`, {
+    headers: { Authorization: `Bearer ${token}` }
   })
 }; 
\ No newline at end of file
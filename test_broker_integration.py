@@ -43,7 +43,7 @@ def test_user_registration_broker():
         data = response.json()
         print_success(f"User registered: {data['username']}")
         print_broker_evidence(f"Registration message: '{data['msg']}'")
-        print_broker_evidence("4 async tasks triggered: welcome email, default tasks, external sync, analytics")
+        print_broker_evidence("Async tasks triggered: welcome email, external sync, analytics (onboarding tasks are created on first list)")
         return True
     else:
         print(f"❌ Registration failed: {response.text}")